@@ -0,0 +1,263 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import (
+    Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+)
+import orjson
+from app.core.config import settings
+from app.core.metrics import CACHE_REQUESTS, CACHE_SERIALIZATION
+
+# Значения в кэше - JSON-совместимые структуры (результат сериализатора),
+# чтобы их можно было хранить и в общем бэкенде
+
+
+class LRUCache:
+    """Кэш в памяти процесса: LRU с TTL и индексом тегов"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any, Set[str]]]" = (
+            OrderedDict()
+        )
+        self._tags: Dict[str, Set[str]] = {}
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value, _ = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    async def set(self, key: str, value: Any, tags: Iterable[str]) -> None:
+        self._remove(key)
+        tags = set(tags)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        removed = 0
+        for tag in tags:
+            for key in self._tags.pop(tag, set()):
+                removed += self._remove(key)
+        return removed
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._tags.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> int:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return 0
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return 1
+
+
+class RedisCache:
+    """Общий для всех воркеров кэш в Redis (нужен пакет redis)"""
+
+    def __init__(
+        self, url: str, ttl_seconds: float, prefix: str = "orgfinder"
+    ):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError(
+                "Для RESPONSE_CACHE_BACKEND=redis установите пакет redis"
+            )
+        self._redis = redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def _key(self, key: str) -> str:
+        # v2: значение хранится вместе с версиями данных; записи прежнего
+        # формата без версий не читаются и истекают по TTL
+        return f"{self.prefix}:cache:v2:{key}"
+
+    def _tag(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        raw = await self._redis.get(self._key(key))
+        if raw is None:
+            return False, None
+        return True, orjson.loads(raw)
+
+    async def set(self, key: str, value: Any, tags: Iterable[str]) -> None:
+        ttl = int(max(self.ttl_seconds, 1))
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.set(self._key(key), orjson.dumps(value), ex=ttl)
+            for tag in tags:
+                pipe.sadd(self._tag(tag), key)
+                pipe.expire(self._tag(tag), ttl)
+            await pipe.execute()
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        keys: Set[bytes] = set()
+        tag_keys = [self._tag(tag) for tag in tags]
+        for tag_key in tag_keys:
+            keys.update(await self._redis.smembers(tag_key))
+        if tag_keys:
+            await self._redis.delete(*tag_keys)
+        if keys:
+            await self._redis.delete(
+                *[self._key(key.decode()) for key in keys]
+            )
+        return len(keys)
+
+    async def clear(self) -> None:
+        async for key in self._redis.scan_iter(f"{self.prefix}:*"):
+            await self._redis.delete(key)
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+# Параметры поиска по названию: он регистронезависимый (ILIKE, pg_trgm),
+# и запросы, отличающиеся только регистром, делят запись кэша. Остальные
+# строки (курсоры и т. п.) регистр различают. name - аргумент
+# search_by_name в ключе объединения запросов
+CASE_INSENSITIVE_PARAMS = frozenset({"search", "search_text", "name"})
+
+
+def _normalize(value: Any) -> Any:
+    """Приведение параметра запроса к каноничному виду для ключа"""
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sorted({_normalize(item) for item in value})
+    return value
+
+
+def make_key(namespace: str, params: Dict[str, Any]) -> str:
+    """Ключ кэша из пространства имен и нормализованных параметров"""
+    normalized = {
+        name: (
+            value.lower()
+            if name in CASE_INSENSITIVE_PARAMS and isinstance(value, str)
+            else _normalize(value)
+        )
+        for name, value in params.items()
+        if value is not None
+    }
+    digest = hashlib.sha1(
+        orjson.dumps(normalized, option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+def _covers(cached: Dict[str, int], requested: Dict[str, int]) -> bool:
+    """Запись собрана на данных не старше тех, что видит запрос.
+
+    Запись новее запроса (например, чтение с отстающей реплики) отдается:
+    устаревшими данные при этом не становятся.
+    """
+    return all(
+        cached.get(table, 0) >= version
+        for table, version in requested.items()
+    )
+
+
+class ResponseCache:
+    """Кэш результатов сервисов с инвалидацией по тегам и метриками"""
+
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_load(
+        self,
+        namespace: str,
+        params: Dict[str, Any],
+        loader: Callable[[], Awaitable[Any]],
+        serializer: Callable[[Any], Any],
+        tags: Callable[[Any], Iterable[str]],
+        versions: Callable[[], Awaitable[Dict[str, int]]]
+    ) -> Any:
+        """Результат из кэша или из loader с сохранением в кэш.
+
+        serializer приводит каждый элемент результата к JSON-совместимому
+        виду, tags возвращает теги сериализованного результата. versions
+        возвращает версии данных (data_versions) и вызывается до loader,
+        только при включенном кэше: запись кэша хранится вместе с ними и
+        отдается, только если она не старше данных, которые видит запрос.
+        Поэтому запись, заполненная с отстающей реплики сразу после
+        инвалидации, не достается запросу, который уже видит запись на
+        основной БД. Цена - запрос версий и при попадании, если их еще
+        не прочитал ETag.
+        """
+        if not self.enabled:
+            return await loader()
+
+        requested = await versions()
+        key = make_key(namespace, params)
+        found, entry = await self.backend.get(key)
+        if found and _covers(entry["versions"], requested):
+            self.hits += 1
+            CACHE_REQUESTS.labels(namespace, "hit").inc()
+            return entry["value"]
+
+        self.misses += 1
+        CACHE_REQUESTS.labels(namespace, "miss").inc()
+        result = await loader()
+        if result is None:
+            return None
+        with CACHE_SERIALIZATION.time():
+            if isinstance(result, list):
+                value = [serializer(item) for item in result]
+            else:
+                value = serializer(result)
+        entry = {"versions": requested, "value": value}
+        await self.backend.set(key, entry, tags(value))
+        return value
+
+    async def invalidate(self, tags: Iterable[str]) -> None:
+        """Удалить все записи, помеченные любым из тегов"""
+        if self.enabled:
+            await self.backend.invalidate_tags(set(tags))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "entries": self.backend.size()
+        }
+
+
+def _create_backend():
+    if settings.RESPONSE_CACHE_BACKEND == "redis":
+        return RedisCache(
+            settings.REDIS_URL, settings.RESPONSE_CACHE_TTL_SECONDS
+        )
+    return LRUCache(
+        settings.RESPONSE_CACHE_MAX_ENTRIES,
+        settings.RESPONSE_CACHE_TTL_SECONDS
+    )
+
+
+response_cache = ResponseCache(
+    _create_backend(), enabled=settings.RESPONSE_CACHE_ENABLED
+)
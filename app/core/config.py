@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 
 
@@ -13,10 +13,102 @@ class Settings(BaseSettings):
         "postgresql+asyncpg://orgfinder_user:orgfinder_pass@"
         "localhost:5432/orgfinder"
     )
+    # Реплика для читающих запросов; без нее чтение идет в основную БД
+    DATABASE_READ_URL: Optional[str] = None
+    # Сколько секунд не ходить в реплику после ошибки подключения
+    READ_REPLICA_RETRY_SECONDS: float = 30.0
+    # Сколько секунд после записи клиент читает из основной БД
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    # Пул соединений. Суммарно по всем воркерам
+    # (DB_POOL_SIZE + DB_MAX_OVERFLOW) * число воркеров не должно
+    # превышать max_connections PostgreSQL за вычетом резерва; рабочий
+    # набор активных соединений порядка 2 * число ядер сервера БД
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    # Секунды ожидания свободного соединения: при исчерпании пула
+    # лучше быстро вернуть ошибку, чем копить очередь запросов
+    DB_POOL_TIMEOUT: float = 5.0
+    # Пересоздавать соединения старше N секунд (балансировщики и
+    # файрволы рвут долгоживущие соединения)
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Кэши подготовленных выражений на соединение. Для pgbouncer в
+    # режиме transaction оба значения нужно выставить в 0
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
 
     ALLOWED_ORIGINS: List[str] = ["*"]
     API_KEY: str = os.getenv("API_KEY", "static_api_key")
 
+    # Кэш дерева деятельностей в памяти процесса. Инвалидация локальна
+    # для процесса, между воркерами изменения видны не позже TTL
+    ACTIVITY_TREE_CACHE_ENABLED: bool = True
+    ACTIVITY_TREE_TTL_SECONDS: int = 300
+
+    # Чтение организаций одним запросом с json_agg вместо selectinload
+    ORGANIZATION_FLAT_READS: bool = False
+
+    # Максимум ID в одном запросе POST /organizations/batch
+    ORGANIZATION_BATCH_MAX_IDS: int = 500
+
+    # Отдача списков через orjson без повторной валидации response_model
+    FAST_SERIALIZATION: bool = True
+
+    # Кэш ответов горячих эндпоинтов: memory - LRU в памяти процесса
+    # (инвалидация только в своем воркере, остальные догоняют по TTL),
+    # redis - общий для всех воркеров кэш по REDIS_URL
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_BACKEND: str = "memory"
+    RESPONSE_CACHE_TTL_SECONDS: float = 30.0
+    RESPONSE_CACHE_MAX_ENTRIES: int = 10000
+    REDIS_URL: str = "redis://localhost:6379/0"
+
+    # max-age для редко меняющихся справочников (здания, дерево
+    # деятельностей); после него клиент перепроверяет ETag
+    HTTP_CACHE_MAX_AGE_SECONDS: int = 60
+
+    # Уровни масштаба предрассчитанных тайлов /tiles/{z}/{x}/{y}. На
+    # более мелких масштабах точек слишком много - для них кластеры
+    TILE_MIN_ZOOM: int = 12
+    TILE_MAX_ZOOM: int = 16
+
+    # Объединение одновременных одинаковых запросов в один запрос к БД.
+    # Имена: radius, nearest, rectangle, clusters, activity_tree,
+    # activity, search, building_organizations
+    SINGLE_FLIGHT_ENDPOINTS: List[str] = [
+        "radius",
+        "nearest",
+        "rectangle",
+        "clusters",
+        "activity_tree",
+        "activity",
+        "search",
+        "building_organizations",
+    ]
+
+    # Подсчет SQL-выражений на запрос: заголовок Server-Timing и поля
+    # db_queries, db_rows, db_ms в логе каждого запроса
+    QUERY_STATS_ENABLED: bool = True
+    QUERY_STATS_LOG: bool = True
+    # Режим для тестов: запрос, выполнивший больше N выражений, падает
+    # с QueryBudgetExceeded. None - без ограничения
+    QUERY_BUDGET: Optional[int] = None
+
+    # Метрики Prometheus на /metrics. При нескольких воркерах нужна
+    # переменная окружения PROMETHEUS_MULTIPROC_DIR (см. README)
+    METRICS_ENABLED: bool = True
+
+    # Журнал SQL-выражений дольше порога: лог, /api/v1/admin/slow-queries
+    # и план EXPLAIN (ANALYZE, BUFFERS) для доли SLOW_QUERY_EXPLAIN_SAMPLE_RATE
+    # читающих выражений. EXPLAIN ANALYZE выполняет запрос повторно
+    SLOW_QUERY_LOG_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: float = 500.0
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.1
+    SLOW_QUERY_EXPLAIN_TIMEOUT_SECONDS: float = 10.0
+    # Сколько последних записей хранить в памяти процесса
+    SLOW_QUERY_LOG_SIZE: int = 100
+
     model_config = {"env_file": ".env"}
 
 
@@ -0,0 +1,91 @@
+import hashlib
+from typing import Dict, Iterable, Optional
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import fetch_short
+from app.models.data_version import DataVersion
+
+# Таблицы, от которых зависит ответ эндпоинта
+BUILDING_TABLES = ("buildings",)
+ACTIVITY_TABLES = ("activities",)
+ORGANIZATION_TABLES = (
+    "organizations",
+    "organization_phones",
+    "activities",
+    "organization_activities",
+)
+
+# Ответы закрыты API-ключом, поэтому кэшировать их может только клиент
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def private_max_age(seconds: int) -> str:
+    return f"private, max-age={seconds}, must-revalidate"
+
+
+async def data_versions(
+    db: AsyncSession, tables: Iterable[str]
+) -> Dict[str, int]:
+    """Версии данных таблиц одним запросом по индексу.
+
+    В пределах сессии версии читаются один раз: ETag, запись кэша ответов
+    и кэш дерева деятельностей опираются на одни и те же значения, а
+    данные ответа читаются после них и потому не старше.
+
+    Запрос идет на коротком соединении движка сессии (fetch_short),
+    которое сразу возвращается в пул: сама сессия транзакцию не начинает
+    и соединение не держит, пока ответ берется из кэша или ждет чужой
+    вызов (single-flight).
+    """
+    known = db.info.setdefault("data_versions", {})
+    missing = [table for table in tables if table not in known]
+    if missing:
+        found = dict(await fetch_short(
+            db,
+            select(DataVersion.table_name, func.sum(DataVersion.version))
+            .where(DataVersion.table_name.in_(missing))
+            .group_by(DataVersion.table_name)
+        ))
+        for table in missing:
+            known[table] = int(found.get(table) or 0)
+    return {table: known[table] for table in tables}
+
+
+def compute_etag(request: Request, versions: Dict[str, int]) -> str:
+    """Слабый ETag из пути, параметров запроса и версий таблиц"""
+    query = sorted(request.query_params.multi_items())
+    source = repr((request.url.path, query, sorted(versions.items())))
+    return 'W/"' + hashlib.sha1(source.encode()).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Слабое сравнение: префикс W/ не учитывается
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    tables: Iterable[str],
+    cache_control: str = PRIVATE_REVALIDATE
+) -> Optional[Response]:
+    """Ответ 304, если у клиента актуальная версия, иначе None.
+
+    Вызывается до загрузки данных: при совпадении ETag ORM и Pydantic не
+    задействуются. Иначе ETag и Cache-Control выставляются в response.
+    """
+    etag = compute_etag(request, await data_versions(db, tables))
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
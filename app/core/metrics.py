@@ -0,0 +1,145 @@
+import os
+import time
+from typing import Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# При нескольких воркерах uvicorn/gunicorn каждый процесс пишет значения
+# в свои mmap-файлы в этом каталоге, а /metrics суммирует их. Каталог
+# должен быть пустым при старте сервиса
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+# Запросы к API обычно укладываются в десятки миллисекунд
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+SERIALIZATION_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25
+)
+
+# Значения метрик защищены собственными блокировками, а не общей. В
+# воркере один поток цикла событий, поэтому блокировки не конкурируют
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Запросы, которые обрабатываются сейчас",
+    multiprocess_mode="livesum"
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Открытые соединения пула",
+    ["engine"],
+    multiprocess_mode="livesum"
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Соединения пула, выданные запросам",
+    ["engine"],
+    multiprocess_mode="livesum"
+)
+CACHE_REQUESTS = Counter(
+    "response_cache_requests",
+    "Обращения к кэшу ответов; доля попаданий - hit / (hit + miss)",
+    ["namespace", "result"]
+)
+SERIALIZATION_SECONDS = Histogram(
+    "serialization_duration_seconds",
+    "Время сериализации: response - ответ API, cache - запись в кэш",
+    ["stage"],
+    buckets=SERIALIZATION_BUCKETS
+)
+RESPONSE_SERIALIZATION = SERIALIZATION_SECONDS.labels("response")
+CACHE_SERIALIZATION = SERIALIZATION_SECONDS.labels("cache")
+
+
+def collect() -> Tuple[bytes, str]:
+    """Текстовое представление метрик всех воркеров"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Убрать gauge-метрики завершающегося воркера из общей суммы"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def instrument_pool(engine: AsyncEngine, name: str) -> None:
+    """Gauge-метрики пула по событиям, без опроса при каждом сборе"""
+    connections = DB_POOL_CONNECTIONS.labels(name)
+    checked_out = DB_POOL_CHECKED_OUT.labels(name)
+    pool = engine.sync_engine.pool
+
+    event.listen(pool, "connect", lambda *args: connections.inc())
+    event.listen(pool, "close", lambda *args: connections.dec())
+    event.listen(pool, "close_detached", lambda *args: connections.dec())
+    event.listen(pool, "checkout", lambda *args: checked_out.inc())
+    event.listen(pool, "checkin", lambda *args: checked_out.dec())
+
+
+def route_template(scope: Scope) -> str:
+    """Шаблон пути запроса, например /api/v1/organizations/{id}/.
+
+    route.path задан относительно роутера, подключенного с префиксом;
+    префикс берется из начала фактического пути. Шаблон, а не сам путь:
+    ID в пути не размножают серии метрики. Запрос, не совпавший ни с
+    одним маршрутом (404, сканеры), получает постоянную метку
+    "unmatched", а не свой путь: число серий ограничено числом маршрутов.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    segments = scope["path"].split("/")
+    prefix = segments[:len(segments) - len(template.split("/")) + 1]
+    return "/".join(prefix) + template
+
+
+class MetricsMiddleware:
+    """Гистограмма задержек по шаблону маршрута и статусу ответа"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            REQUEST_LATENCY.labels(
+                scope["method"], route_template(scope), str(status)
+            ).observe(time.perf_counter() - started)
@@ -0,0 +1,89 @@
+import logging
+import time
+from typing import Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.db.query_stats import QueryStats, track_queries
+
+logger = logging.getLogger(__name__)
+
+
+def server_timing(stats: QueryStats, total_seconds: float) -> str:
+    """Значение заголовка Server-Timing"""
+    return (
+        f'db;dur={stats.db_seconds * 1000:.3f};'
+        f'desc="{stats.statements} queries, {stats.rows} rows", '
+        f"app;dur={total_seconds * 1000:.3f}"
+    )
+
+
+class QueryStatsMiddleware:
+    """Число SQL-выражений, строк и время в БД на каждый HTTP-запрос.
+
+    Итог отдается в заголовке Server-Timing и пишется в лог полями
+    db_queries, db_rows и db_ms. Чистый ASGI, а не BaseHTTPMiddleware:
+    обработчик выполняется в том же контексте, что и подсчет. Подсчет
+    останавливается на последней части тела ответа: фоновые задачи
+    (например, перестроение тайлов) в статистику и бюджет не попадают.
+    """
+
+    def __init__(
+        self, app: ASGIApp, budget: Optional[int] = None, log: bool = True
+    ):
+        self.app = app
+        self.budget = budget
+        self.log = log
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        finished = None
+        status = 500
+
+        with track_queries(self.budget) as stats:
+            async def send_with_timing(message: Message) -> None:
+                nonlocal status, finished
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    # Заголовки уходят до фоновых задач, их запросы
+                    # в Server-Timing не попадают
+                    headers = list(message.get("headers", []))
+                    headers.append((
+                        b"server-timing",
+                        server_timing(
+                            stats, time.perf_counter() - started
+                        ).encode()
+                    ))
+                    message = {**message, "headers": headers}
+                await send(message)
+                if (
+                    message["type"] == "http.response.body"
+                    and not message.get("more_body", False)
+                ):
+                    stats.finish()
+                    finished = time.perf_counter()
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                if self.log:
+                    # Время до отправки ответа, без фоновых задач
+                    duration_ms = (
+                        (finished or time.perf_counter()) - started
+                    ) * 1000
+                    logger.info(
+                        "%s %s %d: %d SQL, %d строк, БД %.1f мс, "
+                        "всего %.1f мс",
+                        scope["method"], scope["path"], status,
+                        stats.statements, stats.rows,
+                        stats.db_seconds * 1000, duration_ms,
+                        extra={
+                            "method": scope["method"],
+                            "path": scope["path"],
+                            "status": status,
+                            "duration_ms": round(duration_ms, 3),
+                            **stats.as_dict(),
+                        }
+                    )
@@ -0,0 +1,119 @@
+import types
+from typing import (
+    Any, Callable, Dict, Optional, Type, Union, get_args, get_origin
+)
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from app.core.config import settings
+from app.core.metrics import RESPONSE_SERIALIZATION
+from app.schemas.building import Building
+from app.schemas.cluster import ClusterGrid
+from app.schemas.organization import (
+    Organization,
+    OrganizationBatch,
+    OrganizationWithDistance
+)
+
+Serializer = Callable[[Any], Dict[str, Any]]
+
+# Поля нет ни в словаре, ни среди атрибутов объекта
+_MISSING = object()
+
+
+def _is_model(annotation: Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    if get_origin(annotation) not in (Union, types.UnionType):
+        return annotation
+    args = [arg for arg in get_args(annotation) if arg is not type(None)]
+    return args[0] if len(args) == 1 else annotation
+
+
+def compile_serializer(schema: Type[BaseModel]) -> Serializer:
+    """Собрать функцию ORM-объект/словарь -> dict по полям схемы"""
+    # План обхода полей строится один раз: при сериализации нет
+    # валидации и разбора аннотаций, только чтение атрибутов
+    plan = []
+    for name, field in schema.model_fields.items():
+        annotation = _unwrap_optional(field.annotation)
+        args = get_args(annotation)
+        nested = None
+        many = False
+        if get_origin(annotation) is list and args and _is_model(args[0]):
+            nested = compile_serializer(args[0])
+            many = True
+        elif _is_model(annotation):
+            nested = compile_serializer(annotation)
+        plan.append((
+            name, field.is_required(), field.get_default, nested, many
+        ))
+
+    def serialize(obj: Any) -> Dict[str, Any]:
+        is_dict = isinstance(obj, dict)
+        data = {}
+        for name, required, get_default, nested, many in plan:
+            if is_dict:
+                value = obj.get(name, _MISSING)
+            else:
+                value = getattr(obj, name, _MISSING)
+            if value is _MISSING:
+                # Pydantic отверг бы такие данные; молча отдавать
+                # PydanticUndefined в ответе нельзя
+                if required:
+                    raise KeyError(
+                        f"{schema.__name__}: нет обязательного поля {name}"
+                    )
+                value = get_default(call_default_factory=True)
+            if nested is not None and value is not None:
+                if many:
+                    value = [nested(item) for item in value]
+                else:
+                    value = nested(value)
+            data[name] = value
+        return data
+
+    return serialize
+
+
+serialize_organization = compile_serializer(Organization)
+serialize_building = compile_serializer(Building)
+serialize_organization_batch = compile_serializer(OrganizationBatch)
+serialize_organization_with_distance = compile_serializer(
+    OrganizationWithDistance
+)
+serialize_cluster_grid = compile_serializer(ClusterGrid)
+
+
+def fast_json(
+    data: Any,
+    serializer: Serializer,
+    response: Optional[Response] = None
+) -> Any:
+    """Ответ из доверенных данных БД без повторной валидации Pydantic"""
+    # При выключенной настройке данные идут обычным путем response_model
+    if not settings.FAST_SERIALIZATION:
+        return data
+
+    with RESPONSE_SERIALIZATION.time():
+        if isinstance(data, list):
+            payload = [serializer(item) for item in data]
+        else:
+            payload = serializer(data)
+        content = orjson.dumps(payload)
+
+    # Готовый Response FastAPI отдает как есть, поэтому заголовки,
+    # выставленные обработчиком (например, X-Next-Cursor), переносим
+    headers = None
+    if response is not None:
+        headers = {
+            key: value for key, value in response.headers.items()
+            if key != "content-length"
+        }
+    return Response(
+        content=content,
+        media_type="application/json",
+        headers=headers
+    )
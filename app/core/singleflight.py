@@ -0,0 +1,130 @@
+import asyncio
+import functools
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Iterable, Tuple
+from app.core.cache import make_key
+from app.core.config import settings
+
+
+class SingleFlight:
+    """Объединение одновременных одинаковых вызовов в один.
+
+    Первый вызов с ключом выполняется, остальные ждут его результат и
+    не выполняют запрос сами. Результат не кэшируется: после завершения
+    вызова следующий запрос с тем же ключом выполнится заново.
+    """
+
+    def __init__(self, namespaces: Iterable[str]):
+        self.namespaces = set(namespaces)
+        self._flights: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._calls: Dict[str, int] = {}
+        self._coalesced: Dict[str, int] = {}
+
+    def enabled_for(self, namespace: str) -> bool:
+        return namespace in self.namespaces
+
+    async def do(
+        self,
+        namespace: str,
+        key: str,
+        call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Выполнить call или дождаться уже идущего вызова с тем же ключом"""
+        if not self.enabled_for(namespace):
+            return await call()
+
+        flight_key = (namespace, key)
+        while True:
+            future = self._flights.get(flight_key)
+            if future is None:
+                break
+            self._coalesced[namespace] = (
+                self._coalesced.get(namespace, 0) + 1
+            )
+            try:
+                # shield: отмена ожидающего запроса не отменяет общий вызов
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Отменен запрос-лидер, а не этот - выполняем сами
+                if not future.cancelled():
+                    raise
+                self._coalesced[namespace] -= 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._flights[flight_key] = future
+        self._calls[namespace] = self._calls.get(namespace, 0) + 1
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Исключение получают ожидающие; если их нет, не логируем
+            # "Future exception was never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._flights[flight_key]
+
+    def stats(self) -> dict:
+        return {
+            namespace: {
+                "enabled": self.enabled_for(namespace),
+                "calls": self._calls.get(namespace, 0),
+                "coalesced": self._coalesced.get(namespace, 0),
+                "in_flight": sum(
+                    1 for name, _ in self._flights if name == namespace
+                )
+            }
+            for namespace in sorted(
+                self.namespaces | set(self._calls) | set(self._coalesced)
+            )
+        }
+
+
+single_flight = SingleFlight(settings.SINGLE_FLIGHT_ENDPOINTS)
+
+
+def coalesced(namespace: str):
+    """Декоратор метода сервиса: одинаковые одновременные вызовы - один.
+
+    Ключ строится из аргументов метода, кроме self и сессии db, а также
+    из движка сессии и версий данных, прочитанных в ней (data_versions):
+    чтение с основной БД после записи не присоединяется к вызову на
+    реплике или на более старых данных. Сессии ожидающих запросов
+    соединение не держат: оно открывается лениво при первом запросе
+    сессии, а версии данных читаются на отдельном соединении, которое
+    возвращается в пул до ожидания. Запрос сессии до вызова метода
+    занял бы соединение на все время ожидания.
+    Общий результат не должен изменяться вызывающими.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        async def wrapper(self, db, *args, **kwargs):
+            if not single_flight.enabled_for(namespace):
+                return await method(self, db, *args, **kwargs)
+            bound = signature.bind(self, db, *args, **kwargs)
+            bound.apply_defaults()
+            params = {
+                name: value for name, value in bound.arguments.items()
+                if name not in ("self", "db")
+            }
+            params["data_versions"] = db.info.get("data_versions")
+            # Разные экземпляры сервиса могут отдавать разную форму
+            # данных, а разные движки - разные данные
+            key = make_key(f"{id(self)}:{id(db.get_bind())}", params)
+            return await single_flight.do(
+                namespace,
+                key,
+                lambda: method(self, db, *args, **kwargs)
+            )
+
+        return wrapper
+
+    return decorator
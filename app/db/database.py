@@ -1,16 +1,65 @@
+import logging
+from typing import Optional
+from fastapi import Request
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     create_async_engine,
     async_sessionmaker
 )
 from app.core.config import settings
+from app.core.metrics import instrument_pool
+from app.db.pool import InstrumentedQueuePool
+from app.db.query_stats import instrument_engine
+from app.db.slow_queries import slow_query_log
+from app.db.routing import ReplicaRouter
+
+logger = logging.getLogger(__name__)
+
+# Методы, которые не меняют данные
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    """Асинхронный движок с настройками пула из Settings"""
+    engine = create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            # Кэш подготовленных выражений asyncpg на соединение
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            # Кэш подготовленных выражений слоя SQLAlchemy на соединение
+            "prepared_statement_cache_size": (
+                settings.DB_PREPARED_STATEMENT_CACHE_SIZE
+            ),
+        }
+    )
+    if settings.QUERY_STATS_ENABLED:
+        instrument_engine(engine)
+    if settings.SLOW_QUERY_LOG_ENABLED:
+        slow_query_log.instrument(engine)
+    return engine
+
 
 # Асинхронный движок
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,
-    future=True
-)
+engine = _create_engine(settings.DATABASE_URL)
+if settings.METRICS_ENABLED:
+    instrument_pool(engine, "primary")
+
+# Движок реплики только для чтения (если настроена)
+read_engine: Optional[AsyncEngine] = None
+if settings.DATABASE_READ_URL:
+    read_engine = _create_engine(settings.DATABASE_READ_URL)
+    if settings.METRICS_ENABLED:
+        instrument_pool(read_engine, "replica")
 
 # Фабрика сессий
 AsyncSessionLocal = async_sessionmaker(
@@ -19,9 +68,126 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+replica_router = ReplicaRouter(
+    retry_seconds=settings.READ_REPLICA_RETRY_SECONDS,
+    sticky_seconds=settings.READ_YOUR_WRITES_SECONDS
+)
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """Не удалось подключиться к БД или соединение оборвалось.
+
+    Ошибки самого запроса (таймаут выражения, отмена, конфликт с
+    восстановлением реплики) сюда не относятся: соединение при них цело.
+    """
+    if isinstance(error, OSError):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+class ReplicaSession(AsyncSession):
+    """Сессия чтения с реплики с откатом на основную БД.
+
+    При ошибке соединения с репликой она помечается недоступной на
+    retry_seconds, а выражение один раз повторяется на основной БД.
+    Повтор возможен, пока сессия не загрузила объекты: откат транзакции
+    сделал бы их устаревшими, и тогда запрос завершается ошибкой.
+    """
+
+    async def execute(self, *args, **kwargs):
+        return await self._with_fallback(super().execute, *args, **kwargs)
+
+    async def scalar(self, *args, **kwargs):
+        return await self._with_fallback(super().scalar, *args, **kwargs)
+
+    async def _with_fallback(self, method, *args, **kwargs):
+        try:
+            return await method(*args, **kwargs)
+        except Exception as e:
+            if not await self.fail_over(e):
+                raise
+        return await method(*args, **kwargs)
+
+    async def fail_over(self, error: BaseException) -> bool:
+        """Переключиться на основную БД после ошибки соединения с репликой"""
+        if self.bind is not read_engine or not is_connection_error(error):
+            return False
+        logger.warning(
+            "Реплика недоступна, чтение идет в основную БД: %s", error
+        )
+        replica_router.mark_replica_unhealthy()
+        if self.identity_map:
+            return False
+        await self.rollback()
+        self.bind = engine
+        return True
 
-async def get_db() -> AsyncSession:
+
+AsyncReadSessionLocal = None
+if read_engine is not None:
+    AsyncReadSessionLocal = async_sessionmaker(
+        read_engine,
+        class_=ReplicaSession,
+        expire_on_commit=False
+    )
+
+
+async def _fetch_all(bind: AsyncEngine, statement) -> list:
+    async with bind.connect() as conn:
+        return (await conn.execute(statement)).all()
+
+
+async def fetch_short(db: AsyncSession, statement) -> list:
+    """Строки выражения на коротком соединении движка сессии.
+
+    Соединение сразу возвращается в пул, сессия транзакцию не начинает.
+    Сессия реплики при ошибке соединения переключается на основную БД.
+    """
+    try:
+        return await _fetch_all(db.bind, statement)
+    except Exception as e:
+        if not (isinstance(db, ReplicaSession) and await db.fail_over(e)):
+            raise
+    return await _fetch_all(db.bind, statement)
+
+
+def _client_key(request: Request) -> Optional[str]:
+    """Идентификатор клиента для read-your-writes"""
+    client_id = request.headers.get("X-Client-Id")
+    if client_id:
+        return client_id
+    return request.client.host if request.client else None
+
+
+async def get_db(request: Request) -> AsyncSession:
     """Dependency для получения асинхронной сессии БД"""
+    # Отмечаем запись до ее выполнения, чтобы следующее чтение клиента
+    # гарантированно пошло в основную БД
+    if request.method not in SAFE_METHODS:
+        replica_router.mark_write(_client_key(request))
+
+    async with AsyncSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+async def get_read_db(request: Request) -> AsyncSession:
+    """Dependency сессии для чтения: реплика с откатом на основную БД"""
+    # Реплика заранее не проверяется: сессия берет соединение лениво, и
+    # лишний запрос на каждое чтение не нужен. Если реплика не ответила на
+    # настоящий запрос, ReplicaSession повторяет его на основной БД
+    if AsyncReadSessionLocal is not None and replica_router.use_replica(
+        _client_key(request)
+    ):
+        async with AsyncReadSessionLocal() as session:
+            try:
+                yield session
+            finally:
+                await session.close()
+        return
+
     async with AsyncSessionLocal() as session:
         try:
             yield session
@@ -0,0 +1,68 @@
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolStats:
+    """Статистика ожидания соединений из пула"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total_seconds = 0.0
+        self.wait_max_seconds = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_total_seconds += seconds
+        if seconds > self.wait_max_seconds:
+            self.wait_max_seconds = seconds
+
+    def as_dict(self) -> dict:
+        average = 0.0
+        if self.checkouts:
+            average = self.wait_total_seconds / self.checkouts
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(average * 1000, 3),
+            "wait_max_ms": round(self.wait_max_seconds * 1000, 3)
+        }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, замеряющий время получения соединения"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        # Ожидание в очереди пула, новое подключение и pre-ping
+        self.stats.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # Пересозданный пул (например, после dispose) сохраняет статистику
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def pool_status(pool) -> dict:
+    """Текущее состояние пула: занятые и свободные соединения, overflow"""
+    status = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+    if isinstance(pool, InstrumentedQueuePool):
+        status.update(pool.stats.as_dict())
+    return status
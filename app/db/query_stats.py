@@ -0,0 +1,99 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Запрос к API выполнил больше SQL-выражений, чем разрешено"""
+
+
+class QueryStats:
+    """SQL-выражения, строки и время в БД в рамках одного запроса"""
+
+    def __init__(self, budget: Optional[int] = None):
+        self.budget = budget
+        self.statements = 0
+        self.rows = 0
+        self.db_seconds = 0.0
+        # Ответ отправлен: дальше выполняются фоновые задачи запроса
+        # (BackgroundTasks), их выражения в счетчики и бюджет не идут
+        self.finished = False
+
+    def finish(self) -> None:
+        """Зафиксировать счетчики по окончании ответа"""
+        self.finished = True
+
+    def record(self, rows: int, seconds: float) -> None:
+        self.rows += max(rows, 0)
+        self.db_seconds += seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "db_queries": self.statements,
+            "db_rows": self.rows,
+            "db_ms": round(self.db_seconds * 1000, 3),
+        }
+
+
+# Статистика текущего запроса. SQLAlchemy переносит контекст в гринлеты,
+# поэтому обработчики событий движка видят значение из обработчика API
+_current: ContextVar[Optional[QueryStats]] = ContextVar(
+    "query_stats", default=None
+)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@contextmanager
+def track_queries(budget: Optional[int] = None) -> Iterator[QueryStats]:
+    """Считать SQL-выражения внутри блока.
+
+    С budget выражение сверх лимита не выполняется, а поднимает
+    QueryBudgetExceeded: трассировка указывает на место лишнего запроса.
+    """
+    stats = QueryStats(budget)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def _before_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    stats = _current.get()
+    if stats is None or stats.finished:
+        return
+    stats.statements += 1
+    if stats.budget is not None and stats.statements > stats.budget:
+        raise QueryBudgetExceeded(
+            f"Превышен бюджет в {stats.budget} SQL-выражений: "
+            f"{statement[:200]}"
+        )
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    stats = _current.get()
+    started = getattr(context, "_query_started", None)
+    if stats is None or stats.finished or started is None:
+        return
+    stats.record(cursor.rowcount, time.perf_counter() - started)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Подключить подсчет выражений к движку"""
+    event.listen(
+        engine.sync_engine, "before_cursor_execute", _before_cursor_execute
+    )
+    event.listen(
+        engine.sync_engine, "after_cursor_execute", _after_cursor_execute
+    )
@@ -0,0 +1,54 @@
+import time
+from typing import Dict, Optional
+
+
+class ReplicaRouter:
+    """Выбор между репликой и основной БД для читающих запросов"""
+
+    # Сколько записей о недавних записях клиентов хранить до чистки
+    MAX_STICKY_CLIENTS = 10000
+
+    def __init__(self, retry_seconds: float, sticky_seconds: float):
+        self.retry_seconds = retry_seconds
+        self.sticky_seconds = sticky_seconds
+        self.fallbacks = 0
+        self._unhealthy_until = 0.0
+        self._sticky: Dict[str, float] = {}
+
+    @property
+    def replica_healthy(self) -> bool:
+        return time.monotonic() >= self._unhealthy_until
+
+    def mark_replica_unhealthy(self) -> None:
+        """Не ходить в реплику retry_seconds секунд"""
+        self.fallbacks += 1
+        self._unhealthy_until = time.monotonic() + self.retry_seconds
+
+    def mark_write(self, client_key: Optional[str]) -> None:
+        """Клиент что-то записал - его чтения временно идут в основную БД"""
+        if not client_key or self.sticky_seconds <= 0:
+            return
+        now = time.monotonic()
+        if len(self._sticky) >= self.MAX_STICKY_CLIENTS:
+            self._sticky = {
+                key: until for key, until in self._sticky.items()
+                if until > now
+            }
+        self._sticky[client_key] = now + self.sticky_seconds
+
+    def use_replica(self, client_key: Optional[str]) -> bool:
+        """Можно ли обслужить чтение клиента репликой"""
+        if not self.replica_healthy:
+            return False
+        if client_key:
+            until = self._sticky.get(client_key)
+            if until is not None and until > time.monotonic():
+                return False
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "replica_healthy": self.replica_healthy,
+            "fallbacks": self.fallbacks,
+            "sticky_clients": len(self._sticky)
+        }
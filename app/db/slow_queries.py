@@ -0,0 +1,222 @@
+import asyncio
+import contextvars
+import logging
+import random
+import re
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, List, Optional
+import orjson
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.config import settings
+from app.core.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+# EXPLAIN ANALYZE выполняет выражение, поэтому план снимается только для
+# чтения, и дополнительно в транзакции READ ONLY
+_READ_ONLY = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_WRITES = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+MAX_VALUE_LENGTH = 200
+
+# Выставлен в задаче EXPLAIN: ее собственные запросы не логируются
+_explaining: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "slow_query_explaining", default=False
+)
+
+# ASGI scope текущего запроса API: по нему в записи журнала определяется
+# маршрут. Выставляет SlowQueryRouteMiddleware, независимо от подсчета
+# выражений (QUERY_STATS_ENABLED) и метрик
+_request_scope: contextvars.ContextVar[Optional[Scope]] = (
+    contextvars.ContextVar("slow_query_request_scope", default=None)
+)
+
+
+class SlowQueryRouteMiddleware:
+    """Запоминает запрос API, чтобы журнал знал маршрут выражения"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_scope.reset(token)
+
+
+def _safe_value(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = value if isinstance(value, str) else repr(value)
+    return text[:MAX_VALUE_LENGTH]
+
+
+def _safe_parameters(parameters: Any) -> Any:
+    """Параметры выражения в JSON-совместимом виде"""
+    if isinstance(parameters, dict):
+        return {key: _safe_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_safe_value(value) for value in parameters]
+    return _safe_value(parameters)
+
+
+def _is_read_only(statement: str) -> bool:
+    return bool(_READ_ONLY.match(statement)) and not _WRITES.search(
+        statement
+    )
+
+
+class SlowQueryLog:
+    """Журнал SQL-выражений дольше порога с выборочным EXPLAIN"""
+
+    def __init__(
+        self,
+        threshold_ms: float,
+        sample_rate: float,
+        max_entries: int,
+        explain_timeout_seconds: float
+    ):
+        self.threshold_seconds = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.explain_timeout_ms = int(explain_timeout_seconds * 1000)
+        self._entries = deque(maxlen=max_entries)
+        # Не больше одного EXPLAIN одновременно: медленные запросы часто
+        # идут пачкой, когда БД и так перегружена
+        self._explain_running = False
+        self._tasks = set()
+
+    def instrument(self, engine: AsyncEngine) -> None:
+        """Подключить журнал к движку; EXPLAIN идет через этот же движок"""
+
+        def before(conn, cursor, statement, parameters, context, many):
+            context._slow_query_started = time.perf_counter()
+
+        def after(conn, cursor, statement, parameters, context, many):
+            started = getattr(context, "_slow_query_started", None)
+            if started is None or _explaining.get():
+                return
+            seconds = time.perf_counter() - started
+            if seconds >= self.threshold_seconds:
+                self._record(engine, statement, parameters, many, seconds)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", before)
+        event.listen(engine.sync_engine, "after_cursor_execute", after)
+
+    def _record(
+        self,
+        engine: AsyncEngine,
+        statement: str,
+        parameters: Any,
+        executemany: bool,
+        seconds: float
+    ) -> None:
+        route = None
+        scope = _request_scope.get()
+        if scope is not None:
+            route = f"{scope['method']} {route_template(scope)}"
+
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(seconds * 1000, 3),
+            "route": route,
+            "statement": statement,
+            "parameters": None if executemany else _safe_parameters(
+                parameters
+            ),
+            "explain": "skipped",
+            "plan": None,
+        }
+        self._entries.append(entry)
+        logger.warning(
+            "Медленный запрос %.1f мс (%s): %s",
+            entry["duration_ms"], route, statement,
+            extra={
+                "duration_ms": entry["duration_ms"],
+                "route": route,
+                "parameters": entry["parameters"],
+            }
+        )
+
+        if executemany or not _is_read_only(statement):
+            entry["explain"] = "not_read_only"
+            return
+        if self._explain_running or random.random() >= self.sample_rate:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Синхронное использование движка вне цикла событий
+            return
+
+        self._explain_running = True
+        entry["explain"] = "pending"
+        # Чистый контекст: запросы EXPLAIN не попадают в счетчики и
+        # бюджет запроса API, который выполнил медленное выражение
+        context = contextvars.Context()
+        context.run(_explaining.set, True)
+        task = loop.create_task(
+            self._explain(engine, entry, statement, parameters),
+            context=context
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _explain(
+        self,
+        engine: AsyncEngine,
+        entry: dict,
+        statement: str,
+        parameters: Any
+    ) -> None:
+        """Снять план на отдельном соединении, не мешая исходному запросу"""
+        try:
+            async with engine.connect() as conn:
+                await conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+                await conn.exec_driver_sql(
+                    f"SET LOCAL statement_timeout = {self.explain_timeout_ms}"
+                )
+                result = await conn.exec_driver_sql(
+                    "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement,
+                    parameters
+                )
+                plan = result.scalar()
+                await conn.rollback()
+            if isinstance(plan, (str, bytes)):
+                plan = orjson.loads(plan)
+            entry["plan"] = plan
+            entry["explain"] = "done"
+            logger.warning(
+                "План медленного запроса (%s): %s",
+                entry["route"], orjson.dumps(plan).decode()
+            )
+        except Exception as e:
+            entry["explain"] = f"error: {e}"
+            logger.warning("Не удалось снять план медленного запроса: %s", e)
+        finally:
+            self._explain_running = False
+
+    def entries(self, limit: Optional[int] = None) -> List[dict]:
+        """Последние записи, новые первыми"""
+        entries = list(reversed(self._entries))
+        return entries[:limit] if limit is not None else entries
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+slow_query_log = SlowQueryLog(
+    settings.SLOW_QUERY_THRESHOLD_MS,
+    settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+    settings.SLOW_QUERY_LOG_SIZE,
+    settings.SLOW_QUERY_EXPLAIN_TIMEOUT_SECONDS
+)
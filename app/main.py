@@ -1,9 +1,24 @@
 import logging
-from fastapi import FastAPI, Depends
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, mark_process_dead
+from app.core.middleware import QueryStatsMiddleware
 from app.core.security import verify_api_key
-from app.routers import health_router, organization_router, building_router
+from app.db.database import AsyncSessionLocal
+from app.db.slow_queries import SlowQueryRouteMiddleware
+from app.routers import (
+    health_router,
+    organization_router,
+    building_router,
+    tiles_router,
+    metrics_router,
+    admin_router
+)
+from app.services.activity_tree import activity_tree
+from app.services.pagination import NEXT_CURSOR_HEADER, InvalidCursor
 
 # Базовая конфигурация логирования
 logging.basicConfig(
@@ -11,6 +26,23 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Прогрев кэшей при старте приложения"""
+    if activity_tree.enabled:
+        try:
+            async with AsyncSessionLocal() as db:
+                await activity_tree.load(db)
+        except Exception:
+            # Без БД на старте дерево загрузится при первом запросе
+            logger.exception("Не удалось загрузить дерево деятельностей")
+    yield
+    mark_process_dead()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
@@ -24,6 +56,7 @@ app = FastAPI(
     license_info={
         "name": "MIT",
     },
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -33,9 +66,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Server-Timing"],
 )
 
+if settings.QUERY_STATS_ENABLED:
+    app.add_middleware(
+        QueryStatsMiddleware,
+        budget=settings.QUERY_BUDGET,
+        log=settings.QUERY_STATS_LOG
+    )
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+if settings.SLOW_QUERY_LOG_ENABLED:
+    app.add_middleware(SlowQueryRouteMiddleware)
+
+
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
 app.include_router(health_router, prefix="/api/v1", tags=["health"])
+if settings.METRICS_ENABLED:
+    app.include_router(metrics_router, tags=["metrics"])
 app.include_router(
     organization_router,
     prefix="/api/v1/organizations",
@@ -48,6 +102,18 @@ app.include_router(
     tags=["buildings"],
     dependencies=[Depends(verify_api_key)]
 )
+app.include_router(
+    tiles_router,
+    prefix="/api/v1/tiles",
+    tags=["tiles"],
+    dependencies=[Depends(verify_api_key)]
+)
+app.include_router(
+    admin_router,
+    prefix="/api/v1/admin",
+    tags=["admin"],
+    dependencies=[Depends(verify_api_key)]
+)
 
 
 @app.get("/")
@@ -9,3 +9,5 @@ from app.models.organization import Organization, OrganizationPhone  # noqa
 from app.models.building import Building  # noqa
 from app.models.activity import Activity  # noqa
 from app.models.associations import organization_activities  # noqa
+from app.models.data_version import DataVersion  # noqa
+from app.models.map_tile import MapTile  # noqa
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func
 from sqlalchemy.orm import relationship
 from app.models import Base
 
@@ -9,8 +9,16 @@ class Activity(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False, index=True)
-    parent_id = Column(Integer, ForeignKey("activities.id"), nullable=True)
+    parent_id = Column(
+        Integer, ForeignKey("activities.id"), nullable=True, index=True
+    )
     level = Column(Integer, nullable=False)  # 1, 2 или 3
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now()
+    )
 
     parent = relationship(
         "Activity", remote_side=[id], back_populates="children"
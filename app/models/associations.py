@@ -1,4 +1,4 @@
-from sqlalchemy import Table, Column, Integer, ForeignKey
+from sqlalchemy import Table, Column, Integer, ForeignKey, Index
 from app.models import Base
 
 # Промежуточная таблица для связи Organization - Activity (many-to-many)
@@ -16,5 +16,11 @@ organization_activities = Table(
         Integer,
         ForeignKey("activities.id"),
         primary_key=True
+    ),
+    # Поиск организаций по деятельности (PK начинается с organization_id)
+    Index(
+        "ix_organization_activities_activity_id",
+        "activity_id",
+        "organization_id"
     )
 )
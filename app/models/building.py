@@ -1,12 +1,71 @@
-from sqlalchemy import Column, Integer, Float, Text
+from sqlalchemy import (
+    DDL, Column, Integer, Float, Text, FetchedValue, Index, DateTime,
+    event, func
+)
 from app.models import Base
 
+# Номер ячейки сетки 0.01° (см. app.services.geo), вычисляется в БД
+GEO_CELL_SQL = (
+    "LEAST(GREATEST(floor((latitude + 90) / 0.01::double precision), 0), "
+    "18000)::integer * 36000 + "
+    "LEAST(GREATEST(floor((longitude + 180) / 0.01::double precision), 0), "
+    "35999)::integer"
+)
+
+# Колонка заполняется триггером, а не генерируется (GENERATED ... STORED):
+# добавление генерируемой колонки переписывает всю таблицу под
+# эксклюзивной блокировкой. Функции и триггер создает миграция
+# buildings_geo_cell, а для create_all - события таблицы ниже
+GEO_CELL_DDL = [
+    DDL(
+        "CREATE OR REPLACE FUNCTION buildings_geo_cell("
+        "latitude double precision, longitude double precision"
+        f") RETURNS integer AS $$ SELECT {GEO_CELL_SQL} $$ "
+        "LANGUAGE sql IMMUTABLE"
+    ),
+    DDL(
+        "CREATE OR REPLACE FUNCTION buildings_set_geo_cell() "
+        "RETURNS trigger AS $$ BEGIN "
+        "NEW.geo_cell := buildings_geo_cell(NEW.latitude, NEW.longitude); "
+        "RETURN NEW; END; $$ LANGUAGE plpgsql"
+    ),
+    DDL(
+        "CREATE TRIGGER buildings_set_geo_cell "
+        "BEFORE INSERT OR UPDATE OF latitude, longitude ON buildings "
+        "FOR EACH ROW EXECUTE FUNCTION buildings_set_geo_cell()"
+    ),
+]
+
 
 class Building(Base):
     """Здания"""
     __tablename__ = "buildings"
+    __table_args__ = (
+        Index("ix_buildings_latitude_longitude", "latitude", "longitude"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     address = Column(Text, nullable=False)
     latitude = Column(Float, nullable=False)  # Широта
     longitude = Column(Float, nullable=False)  # Долгота
+    # Ячейка пространственной сетки для индексного поиска по радиусу
+    geo_cell = Column(
+        Integer,
+        server_default=FetchedValue(),
+        server_onupdate=FetchedValue(),
+        index=True
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now()
+    )
+
+
+for ddl in GEO_CELL_DDL:
+    event.listen(
+        Building.__table__,
+        "after_create",
+        ddl.execute_if(dialect="postgresql")
+    )
@@ -0,0 +1,15 @@
+from sqlalchemy import BigInteger, Column, Identity, String
+from app.models import Base
+
+
+class DataVersion(Base):
+    """Приращение версии данных таблицы, добавляется триггером при записи.
+
+    Версия таблицы - сумма version ее строк: триггер не обновляет общую
+    строку, а добавляет свою и сворачивает незаблокированные.
+    """
+    __tablename__ = "data_versions"
+
+    id = Column(BigInteger, Identity(), primary_key=True)
+    table_name = Column(String(64), nullable=False, index=True)
+    version = Column(BigInteger, nullable=False, server_default="0")
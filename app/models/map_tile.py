@@ -0,0 +1,22 @@
+from sqlalchemy import (
+    Column, Integer, SmallInteger, LargeBinary, DateTime, func
+)
+from app.models import Base
+
+
+class MapTile(Base):
+    """Предрассчитанный тайл карты z/x/y с точками организаций"""
+    __tablename__ = "map_tiles"
+
+    z = Column(SmallInteger, primary_key=True)
+    x = Column(Integer, primary_key=True)
+    y = Column(Integer, primary_key=True)
+    # Готовый ответ эндпоинта тайла (компактный JSON)
+    payload = Column(LargeBinary, nullable=False)
+    organizations = Column(Integer, nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now()
+    )
@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Column, Integer, String, ForeignKey
+    Column, Integer, String, ForeignKey, Index, DateTime, func
 )
 from sqlalchemy.orm import relationship
 from app.models import Base
@@ -12,19 +12,36 @@ class OrganizationPhone(Base):
     id = Column(Integer, primary_key=True, index=True)
     phone_number = Column(String(50), nullable=False)
     organization_id = Column(
-        Integer, ForeignKey("organizations.id"), nullable=False
+        Integer, ForeignKey("organizations.id"), nullable=False, index=True
     )
 
 
 class Organization(Base):
     """Организация"""
     __tablename__ = "organizations"
+    __table_args__ = (
+        # Триграммный индекс для поиска подстроки (ILIKE '%...%')
+        Index(
+            "ix_organizations_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"}
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False, index=True)
 
     # Связь с зданием (many-to-one)
-    building_id = Column(Integer, ForeignKey("buildings.id"), nullable=False)
+    building_id = Column(
+        Integer, ForeignKey("buildings.id"), nullable=False, index=True
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now()
+    )
 
     # Связь с деятельностями (many-to-many)
     activities = relationship(
@@ -1,9 +1,15 @@
 from .health import router as health_router
 from .organization import router as organization_router
 from .building import router as building_router
+from .tiles import router as tiles_router
+from .metrics import router as metrics_router
+from .admin import router as admin_router
 
 __all__ = [
     "health_router",
     "organization_router",
-    "building_router"
+    "building_router",
+    "tiles_router",
+    "metrics_router",
+    "admin_router"
 ]
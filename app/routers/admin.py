@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Query
+from app.core.config import settings
+from app.db.slow_queries import slow_query_log
+
+router = APIRouter()
+
+
+@router.get("/slow-queries")
+async def get_slow_queries(
+    limit: int = Query(50, ge=1, le=settings.SLOW_QUERY_LOG_SIZE)
+):
+    """Последние медленные SQL-выражения этого воркера с планами"""
+    return {
+        "enabled": settings.SLOW_QUERY_LOG_ENABLED,
+        "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+        "entries": slow_query_log.entries(limit),
+    }
@@ -1,10 +1,26 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
-from app.db.database import get_db
+from typing import List, Optional
+from app.core.cache import response_cache
+from app.core.config import settings
+from app.core.etag import (
+    BUILDING_TABLES,
+    ORGANIZATION_TABLES,
+    conditional_get,
+    data_versions,
+    private_max_age
+)
+from app.core.serialization import (
+    fast_json,
+    serialize_building,
+    serialize_organization
+)
+from app.db.database import get_read_db
 from app.schemas.building import Building
 from app.schemas.organization import Organization
 from app.services.building import BuildingService
+from app.services.cache_tags import BUILDINGS_TAG, building_tag, list_tags
+from app.services.pagination import ORDER_BY_ID, set_next_cursor
 
 router = APIRouter()
 building_service = BuildingService()
@@ -12,22 +28,64 @@ building_service = BuildingService()
 
 @router.get("/", response_model=List[Building])
 async def get_buildings(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = Query(
+        None, description="Курсор следующей страницы из X-Next-Cursor"
+    ),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Получить список всех зданий"""
-    return await building_service.get_all(db, skip, limit)
+    not_modified = await conditional_get(
+        request, response, db, BUILDING_TABLES,
+        private_max_age(settings.HTTP_CACHE_MAX_AGE_SECONDS)
+    )
+    if not_modified:
+        return not_modified
+    buildings = await response_cache.get_or_load(
+        "buildings:list",
+        {"skip": skip, "limit": limit, "cursor": cursor},
+        lambda: building_service.get_all(db, skip, limit, cursor=cursor),
+        serialize_building,
+        lambda value: {BUILDINGS_TAG},
+        lambda: data_versions(db, BUILDING_TABLES)
+    )
+    set_next_cursor(response, buildings, limit, ORDER_BY_ID)
+    return fast_json(buildings, serialize_building, response)
 
 
 @router.get("/{building_id}/organizations", response_model=List[Organization])
 async def get_building_organizations(
     building_id: int,
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = Query(
+        None, description="Курсор следующей страницы из X-Next-Cursor"
+    ),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Получить список организаций в конкретном здании"""
-    return await building_service.get_organizations(
-        db, building_id, skip, limit
+    not_modified = await conditional_get(
+        request, response, db, ORGANIZATION_TABLES
+    )
+    if not_modified:
+        return not_modified
+    organizations = await response_cache.get_or_load(
+        "buildings:organizations",
+        {
+            "building_id": building_id, "skip": skip, "limit": limit,
+            "cursor": cursor
+        },
+        lambda: building_service.get_organizations(
+            db, building_id, skip, limit, cursor=cursor
+        ),
+        serialize_organization,
+        list_tags(building_tag(building_id)),
+        lambda: data_versions(db, ORGANIZATION_TABLES)
     )
+    set_next_cursor(response, organizations, limit, ORDER_BY_ID)
+    return fast_json(organizations, serialize_organization, response)
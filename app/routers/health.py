@@ -1,7 +1,11 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from app.db.database import get_db
+from app.core.cache import response_cache
+from app.core.singleflight import single_flight
+from app.db.database import engine, get_db, read_engine, replica_router
+from app.db.pool import pool_status
+from app.services.activity_tree import activity_tree
 
 router = APIRouter()
 
@@ -24,3 +28,35 @@ async def health_check(db: AsyncSession = Depends(get_db)):
         }
 
 
+@router.get("/health/activity-tree")
+async def activity_tree_stats():
+    """Метрики кэша дерева деятельностей"""
+    return activity_tree.stats()
+
+
+@router.get("/health/pool")
+async def pool_stats():
+    """Состояние пула соединений с БД"""
+    return pool_status(engine.pool)
+
+
+@router.get("/health/replica")
+async def replica_stats():
+    """Состояние маршрутизации чтения на реплику"""
+    stats = {"configured": read_engine is not None}
+    if read_engine is not None:
+        stats.update(replica_router.stats())
+        stats["pool"] = pool_status(read_engine.pool)
+    return stats
+
+
+@router.get("/health/cache")
+async def cache_stats():
+    """Метрики кэша ответов"""
+    return response_cache.stats()
+
+
+@router.get("/health/single-flight")
+async def single_flight_stats():
+    """Счетчики объединенных одновременных запросов"""
+    return single_flight.stats()
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+from app.core.metrics import collect
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики в текстовом формате Prometheus"""
+    content, media_type = collect()
+    return Response(content=content, media_type=media_type)
@@ -1,51 +1,167 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from pydantic import BaseModel
-from app.db.database import get_db
+from pydantic import BaseModel, Field
+from app.core.cache import response_cache
+from app.core.config import settings
+from app.core.etag import (
+    ACTIVITY_TABLES,
+    ORGANIZATION_TABLES,
+    conditional_get,
+    data_versions,
+    private_max_age
+)
+from app.core.serialization import (
+    fast_json,
+    serialize_cluster_grid,
+    serialize_organization,
+    serialize_organization_batch,
+    serialize_organization_with_distance
+)
+from app.db.database import AsyncSessionLocal, get_db, get_read_db
+from app.schemas.cluster import ClusterGrid
 from app.schemas.organization import (
     Organization,
+    OrganizationBatch,
+    OrganizationBatchRequest,
     OrganizationCreate,
-    OrganizationUpdate
+    OrganizationUpdate,
+    OrganizationWithDistance
+)
+from app.services.activity_tree import activity_tree
+from app.services.cache_tags import (
+    ORGANIZATIONS_TAG,
+    activity_tag,
+    list_tags,
+    organization_tags,
+    write_tags
 )
 from app.services.organization import OrganizationService
+from app.services.pagination import (
+    ORDER_BY_DISTANCE,
+    ORDER_BY_ID,
+    ORDER_BY_NAME,
+    set_next_cursor
+)
+from app.services.tiles import TileService
 
 router = APIRouter()
 organization_service = OrganizationService()
+tile_service = TileService(AsyncSessionLocal)
+
+
+def _building_id(organization) -> int:
+    if isinstance(organization, dict):
+        return organization["building_id"]
+    return organization.building_id
 
 
 @router.post("/", response_model=Organization)
 async def create_organization(
     organization: OrganizationCreate,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db)
 ):
     """Создать новую организацию"""
-    return await organization_service.create(db, organization.dict())
+    created = await organization_service.create(db, organization.dict())
+    await response_cache.invalidate(write_tags(
+        [organization.building_id], organization.activity_ids
+    ))
+    background_tasks.add_task(
+        tile_service.rebuild_for_buildings, [organization.building_id]
+    )
+    return created
 
 
 @router.get("/", response_model=List[Organization])
 async def get_organizations(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(
+        None, description="Курсор следующей страницы из X-Next-Cursor"
+    ),
     search: str = Query(None),
-    db: AsyncSession = Depends(get_db)
+    ranked: bool = Query(
+        False, description="Сортировать результаты поиска по похожести"
+    ),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Получить список организаций"""
+    not_modified = await conditional_get(
+        request, response, db, ORGANIZATION_TABLES
+    )
+    if not_modified:
+        return not_modified
+    params = {"skip": skip, "limit": limit, "cursor": cursor}
     if search:
-        return await organization_service.search_by_name(
-            db, search, skip, limit
+        organizations = await response_cache.get_or_load(
+            "organizations:search",
+            {**params, "search": search, "ranked": ranked},
+            lambda: organization_service.search_by_name(
+                db, search, skip, limit, ranked=ranked, cursor=cursor
+            ),
+            serialize_organization,
+            list_tags(ORGANIZATIONS_TAG),
+            lambda: data_versions(db, ORGANIZATION_TABLES)
         )
+        if not ranked:
+            set_next_cursor(response, organizations, limit, ORDER_BY_NAME)
     else:
-        return await organization_service.get_all(db, skip, limit)
+        organizations = await response_cache.get_or_load(
+            "organizations:list",
+            params,
+            lambda: organization_service.get_all(
+                db, skip, limit, cursor=cursor
+            ),
+            serialize_organization,
+            list_tags(ORGANIZATIONS_TAG),
+            lambda: data_versions(db, ORGANIZATION_TABLES)
+        )
+        set_next_cursor(response, organizations, limit, ORDER_BY_ID)
+    return fast_json(organizations, serialize_organization, response)
+
+
+@router.post("/batch", response_model=OrganizationBatch)
+async def get_organizations_batch(
+    request: OrganizationBatchRequest,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Получить организации по списку ID в порядке запроса"""
+    batch = await organization_service.get_batch(db, request.ids)
+    return fast_json(batch, serialize_organization_batch)
 
 
 @router.get("/{organization_id}/", response_model=Organization)
 async def get_organization(
     organization_id: int,
-    db: AsyncSession = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Получить организацию по ID"""
-    organization = await organization_service.get_by_id(db, organization_id)
+    not_modified = await conditional_get(
+        request, response, db, ORGANIZATION_TABLES
+    )
+    if not_modified:
+        return not_modified
+    organization = await response_cache.get_or_load(
+        "organizations:by-id",
+        {"id": organization_id},
+        lambda: organization_service.get_by_id(db, organization_id),
+        serialize_organization,
+        list_tags(),
+        lambda: data_versions(db, ORGANIZATION_TABLES)
+    )
     if not organization:
         raise HTTPException(status_code=404, detail="Организация не найдена")
     return organization
@@ -55,6 +171,7 @@ async def get_organization(
 async def update_organization(
     organization_id: int,
     organization: OrganizationUpdate,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db)
 ):
     """Обновить организацию"""
@@ -62,13 +179,29 @@ async def update_organization(
     if not existing:
         raise HTTPException(status_code=404, detail="Организация не найдена")
 
+    # Сбрасываем выборки и по старым, и по новым зданию и деятельностям.
+    # Старые теги берем до записи: ORM-объект обновится на месте
+    stale_tags = organization_tags(existing) | write_tags(
+        [organization.building_id] if organization.building_id else [],
+        organization.activity_ids or []
+    )
+    building_ids = [_building_id(existing), organization.building_id]
     update_data = organization.dict(exclude_unset=True)
-    return await organization_service.update(db, organization_id, update_data)
+    updated = await organization_service.update(
+        db, organization_id, update_data
+    )
+    await response_cache.invalidate(stale_tags)
+    # Тайлы старого и нового здания пересобираются после ответа
+    background_tasks.add_task(
+        tile_service.rebuild_for_buildings, building_ids
+    )
+    return updated
 
 
 @router.delete("/{organization_id}")
 async def delete_organization(
     organization_id: int,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db)
 ):
     """Удалить организацию"""
@@ -76,21 +209,49 @@ async def delete_organization(
     if not existing:
         raise HTTPException(status_code=404, detail="Организация не найдена")
 
+    stale_tags = organization_tags(existing) | write_tags()
+    building_ids = [_building_id(existing)]
     await organization_service.delete(db, organization_id)
+    await response_cache.invalidate(stale_tags)
+    background_tasks.add_task(
+        tile_service.rebuild_for_buildings, building_ids
+    )
     return {"message": "Организация удалена"}
 
 
 @router.get("/by-activity/{activity_id}/", response_model=List[Organization])
 async def get_organizations_by_activity(
     activity_id: int,
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = Query(
+        None, description="Курсор следующей страницы из X-Next-Cursor"
+    ),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Получить организации по виду деятельности"""
-    return await organization_service.get_by_activity(
-        db, activity_id, skip, limit
+    not_modified = await conditional_get(
+        request, response, db, ORGANIZATION_TABLES
+    )
+    if not_modified:
+        return not_modified
+    organizations = await response_cache.get_or_load(
+        "organizations:by-activity",
+        {
+            "activity_id": activity_id, "skip": skip, "limit": limit,
+            "cursor": cursor
+        },
+        lambda: organization_service.get_by_activity(
+            db, activity_id, skip, limit, cursor=cursor
+        ),
+        serialize_organization,
+        list_tags(activity_tag(activity_id)),
+        lambda: data_versions(db, ORGANIZATION_TABLES)
     )
+    set_next_cursor(response, organizations, limit, ORDER_BY_ID)
+    return fast_json(organizations, serialize_organization, response)
 
 
 @router.get(
@@ -99,14 +260,44 @@ async def get_organizations_by_activity(
 )
 async def get_organizations_by_activity_tree(
     activity_id: int,
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = Query(
+        None, description="Курсор следующей страницы из X-Next-Cursor"
+    ),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Получить организации по дереву деятельности (включая дочерние)"""
-    return await organization_service.get_by_activity_tree(
-        db, activity_id, skip, limit
+    not_modified = await conditional_get(
+        request, response, db, ORGANIZATION_TABLES
+    )
+    if not_modified:
+        return not_modified
+    # Выборка зависит от всех деятельностей поддерева
+    if activity_tree.enabled:
+        scope = [
+            activity_tag(descendant_id) for descendant_id
+            in await activity_tree.descendants(db, activity_id)
+        ]
+    else:
+        scope = [ORGANIZATIONS_TAG]
+    organizations = await response_cache.get_or_load(
+        "organizations:by-activity-tree",
+        {
+            "activity_id": activity_id, "skip": skip, "limit": limit,
+            "cursor": cursor
+        },
+        lambda: organization_service.get_by_activity_tree(
+            db, activity_id, skip, limit, cursor=cursor
+        ),
+        serialize_organization,
+        list_tags(*scope),
+        lambda: data_versions(db, ORGANIZATION_TABLES)
     )
+    set_next_cursor(response, organizations, limit, ORDER_BY_ID)
+    return fast_json(organizations, serialize_organization, response)
 
 
 class RadiusSearchRequest(BaseModel):
@@ -115,8 +306,22 @@ class RadiusSearchRequest(BaseModel):
     longitude: float
     radius_m: float
     activity_ids: Optional[List[int]] = None
+    # Учитывать и дочерние деятельности activity_ids
+    include_child_activities: bool = False
     search_text: Optional[str] = None
     limit: int = 100
+    # Курсор следующей страницы из X-Next-Cursor
+    cursor: Optional[str] = None
+
+
+class NearestSearchRequest(BaseModel):
+    """Схема для поиска ближайших организаций"""
+    latitude: float
+    longitude: float
+    k: int = Field(10, ge=1, le=100)
+    # Деятельности учитываются вместе с дочерними
+    activity_ids: Optional[List[int]] = None
+    search_text: Optional[str] = None
 
 
 class RectangleSearchRequest(BaseModel):
@@ -126,75 +331,154 @@ class RectangleSearchRequest(BaseModel):
     min_longitude: float
     max_longitude: float
     activity_ids: Optional[List[int]] = None
+    # Учитывать и дочерние деятельности activity_ids
+    include_child_activities: bool = False
     search_text: Optional[str] = None
     limit: int = 100
 
 
-@router.post("/search/radius", response_model=List[Organization])
+class ClusterSearchRequest(BaseModel):
+    """Схема для кластеризации организаций во вьюпорте карты"""
+    min_latitude: float = Field(..., ge=-90, le=90)
+    max_latitude: float = Field(..., ge=-90, le=90)
+    min_longitude: float = Field(..., ge=-180, le=180)
+    max_longitude: float = Field(..., ge=-180, le=180)
+    zoom: int = Field(..., ge=0, le=22)
+    # Деятельности учитываются вместе с дочерними
+    activity_ids: Optional[List[int]] = None
+    search_text: Optional[str] = None
+
+
+@router.post(
+    "/search/radius", response_model=List[OrganizationWithDistance]
+)
 async def search_organizations_by_radius(
     request: RadiusSearchRequest,
-    db: AsyncSession = Depends(get_db)
+    response: Response,
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Поиск организаций в радиусе от точки"""
-    return await organization_service.find_within_radius(
-        db=db,
-        latitude=request.latitude,
-        longitude=request.longitude,
-        radius_m=request.radius_m,
-        activity_ids=request.activity_ids,
-        search_text=request.search_text,
-        limit=request.limit
+    organizations = await response_cache.get_or_load(
+        "organizations:radius",
+        request.model_dump(),
+        lambda: organization_service.find_within_radius(
+            db=db,
+            latitude=request.latitude,
+            longitude=request.longitude,
+            radius_m=request.radius_m,
+            activity_ids=request.activity_ids,
+            search_text=request.search_text,
+            limit=request.limit,
+            cursor=request.cursor,
+            include_child_activities=request.include_child_activities
+        ),
+        serialize_organization_with_distance,
+        list_tags(ORGANIZATIONS_TAG),
+        lambda: data_versions(db, ORGANIZATION_TABLES)
+    )
+    set_next_cursor(response, organizations, request.limit, ORDER_BY_DISTANCE)
+    return fast_json(
+        organizations, serialize_organization_with_distance, response
     )
 
 
+@router.post(
+    "/search/nearest", response_model=List[OrganizationWithDistance]
+)
+async def search_nearest_organizations(
+    request: NearestSearchRequest,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Поиск k ближайших к точке организаций"""
+    organizations = await response_cache.get_or_load(
+        "organizations:nearest",
+        request.model_dump(),
+        lambda: organization_service.find_nearest(
+            db=db,
+            latitude=request.latitude,
+            longitude=request.longitude,
+            k=request.k,
+            activity_ids=request.activity_ids,
+            search_text=request.search_text
+        ),
+        serialize_organization_with_distance,
+        list_tags(ORGANIZATIONS_TAG),
+        lambda: data_versions(db, ORGANIZATION_TABLES)
+    )
+    return fast_json(organizations, serialize_organization_with_distance)
+
+
 @router.post("/search/rectangle", response_model=List[Organization])
 async def search_organizations_by_rectangle(
     request: RectangleSearchRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Поиск организаций в прямоугольной области"""
-    return await organization_service.find_within_rectangle(
-        db=db,
-        min_latitude=request.min_latitude,
-        max_latitude=request.max_latitude,
-        min_longitude=request.min_longitude,
-        max_longitude=request.max_longitude,
-        activity_ids=request.activity_ids,
-        search_text=request.search_text,
-        limit=request.limit
+    organizations = await response_cache.get_or_load(
+        "organizations:rectangle",
+        request.model_dump(),
+        lambda: organization_service.find_within_rectangle(
+            db=db,
+            min_latitude=request.min_latitude,
+            max_latitude=request.max_latitude,
+            min_longitude=request.min_longitude,
+            max_longitude=request.max_longitude,
+            activity_ids=request.activity_ids,
+            search_text=request.search_text,
+            limit=request.limit,
+            include_child_activities=request.include_child_activities
+        ),
+        serialize_organization,
+        list_tags(ORGANIZATIONS_TAG),
+        lambda: data_versions(db, ORGANIZATION_TABLES)
     )
+    return fast_json(organizations, serialize_organization)
+
+
+@router.post("/search/clusters", response_model=ClusterGrid)
+async def search_organization_clusters(
+    request: ClusterSearchRequest,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Кластеры организаций во вьюпорте для уровня масштаба карты"""
+    if (
+        request.min_latitude > request.max_latitude
+        or request.min_longitude > request.max_longitude
+    ):
+        raise HTTPException(
+            status_code=400, detail="Некорректные границы вьюпорта"
+        )
+    grid = await response_cache.get_or_load(
+        "organizations:clusters",
+        request.model_dump(),
+        lambda: organization_service.get_clusters(
+            db=db,
+            min_latitude=request.min_latitude,
+            max_latitude=request.max_latitude,
+            min_longitude=request.min_longitude,
+            max_longitude=request.max_longitude,
+            zoom=request.zoom,
+            activity_ids=request.activity_ids,
+            search_text=request.search_text
+        ),
+        serialize_cluster_grid,
+        lambda value: {ORGANIZATIONS_TAG},
+        lambda: data_versions(db, ORGANIZATION_TABLES)
+    )
+    return fast_json(grid, serialize_cluster_grid)
 
 
 @router.get("/activities/tree/")
-async def get_activities_tree(db: AsyncSession = Depends(get_db)):
+async def get_activities_tree(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db)
+):
     """Получить дерево деятельностей с уровнями вложенности"""
-    from app.models.activity import Activity
-    from sqlalchemy import select
-    
-    # Получаем все деятельности
-    result = await db.execute(select(Activity))
-    activities = result.scalars().all()
-    
-    # Группируем по уровням
-    tree = {
-        "level_1": [],
-        "level_2": [],
-        "level_3": []
-    }
-    
-    for activity in activities:
-        level_data = {
-            "id": activity.id,
-            "name": activity.name,
-            "parent_id": activity.parent_id,
-            "level": activity.level
-        }
-        
-        if activity.level == 1:
-            tree["level_1"].append(level_data)
-        elif activity.level == 2:
-            tree["level_2"].append(level_data)
-        elif activity.level == 3:
-            tree["level_3"].append(level_data)
-    
-    return tree
+    not_modified = await conditional_get(
+        request, response, db, ACTIVITY_TABLES,
+        private_max_age(settings.HTTP_CACHE_MAX_AGE_SECONDS)
+    )
+    if not_modified:
+        return not_modified
+    return await activity_tree.levels(db)
@@ -0,0 +1,43 @@
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.etag import private_max_age
+from app.db.database import AsyncSessionLocal, get_read_db
+from app.services.tiles import TileService
+
+router = APIRouter()
+tile_service = TileService(AsyncSessionLocal)
+
+
+@router.get("/{z}/{x}/{y}")
+async def get_tile(
+    z: int,
+    x: int,
+    y: int,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Тайл карты: точки организаций [id, широта, долгота, [деятельности]]"""
+    if not tile_service.is_valid(z, x, y):
+        raise HTTPException(status_code=404, detail="Тайл не найден")
+
+    payload = await tile_service.get(db, z, x, y)
+    if payload is None:
+        # Тайл еще не собран: отдаем собранный на лету и сохраняем в фоне.
+        # Пустые тайлы не сохраняются
+        tile = await tile_service.render(db, z, x, y)
+        payload = orjson.dumps(tile)
+        if tile["points"]:
+            background_tasks.add_task(tile_service.store, z, x, y)
+
+    return Response(
+        content=payload,
+        media_type="application/json",
+        headers={
+            "Cache-Control": private_max_age(
+                settings.HTTP_CACHE_MAX_AGE_SECONDS
+            )
+        }
+    )
@@ -10,6 +10,10 @@ from app.schemas.building import (
 from app.schemas.activity import (
     Activity
 )
+from app.schemas.cluster import (
+    Cluster,
+    ClusterGrid
+)
 
 __all__ = [
     "OrganizationCreate",
@@ -17,5 +21,7 @@ __all__ = [
     "Organization",
     "Building",
     "Activity",
-    "Phone"
+    "Phone",
+    "Cluster",
+    "ClusterGrid"
 ]
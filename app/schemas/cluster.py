@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class ClusterActivity(BaseModel):
+    """Число организаций кластера с данной деятельностью"""
+    activity_id: int
+    count: int
+
+
+class Cluster(BaseModel):
+    """Кластер организаций в ячейке сетки"""
+    latitude: float  # Центроид организаций ячейки
+    longitude: float
+    count: int
+    # ID организации, если она в кластере одна
+    organization_id: Optional[int] = None
+    # Границы ячейки
+    min_latitude: float
+    max_latitude: float
+    min_longitude: float
+    max_longitude: float
+    activities: List[ClusterActivity] = []
+
+
+class ClusterGrid(BaseModel):
+    """Кластеры вьюпорта и размер ячейки сетки в градусах"""
+    cell_size: float
+    clusters: List[Cluster] = []
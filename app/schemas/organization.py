@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
+from app.core.config import settings
 
 
 class OrganizationBase(BaseModel):
@@ -62,3 +63,21 @@ class Organization(OrganizationBase):
 
     class Config:
         from_attributes = True
+
+
+class OrganizationBatchRequest(BaseModel):
+    """Схема запроса организаций по списку ID"""
+    ids: List[int] = Field(
+        ..., min_length=1, max_length=settings.ORGANIZATION_BATCH_MAX_IDS
+    )
+
+
+class OrganizationBatch(BaseModel):
+    """Организации в порядке запроса и ID, которых нет в базе"""
+    organizations: List[Organization] = []
+    missing_ids: List[int] = []
+
+
+class OrganizationWithDistance(Organization):
+    """Организация с расстоянием до точки поиска в метрах"""
+    distance_m: float
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import time
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.etag import ACTIVITY_TABLES, data_versions
+from app.models.activity import Activity
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityTree:
+    """Кэш иерархии деятельностей в памяти процесса"""
+
+    def __init__(self, ttl_seconds: int, enabled: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._activities: Dict[int, dict] = {}
+        self._children: Dict[int, List[int]] = {}
+        self._descendants: Dict[int, FrozenSet[int]] = {}
+        self._loaded_at: Optional[float] = None
+        # Версия activities, прочитанная перед загрузкой дерева
+        self._version = 0
+        self._stale = True
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _known_version(db: AsyncSession) -> Optional[int]:
+        """Версия activities, уже прочитанная запросом (ETag, кэш ответов)"""
+        return db.info.get("data_versions", {}).get("activities")
+
+    async def _fetch(self, db: AsyncSession) -> Tuple[
+        Dict[int, dict], Dict[int, List[int]], Dict[int, FrozenSet[int]]
+    ]:
+        """Деятельности, дочерние и потомки из БД одним запросом"""
+        result = await db.execute(select(Activity).order_by(Activity.id))
+        activities = {
+            activity.id: {
+                "id": activity.id,
+                "name": activity.name,
+                "parent_id": activity.parent_id,
+                "level": activity.level
+            }
+            for activity in result.scalars().all()
+        }
+
+        children: Dict[int, List[int]] = {
+            activity_id: [] for activity_id in activities
+        }
+        for activity in activities.values():
+            if activity["parent_id"] in children:
+                children[activity["parent_id"]].append(activity["id"])
+
+        descendants: Dict[int, FrozenSet[int]] = {}
+
+        def collect(activity_id: int) -> FrozenSet[int]:
+            if activity_id not in descendants:
+                ids = {activity_id}
+                for child_id in children[activity_id]:
+                    ids.update(collect(child_id))
+                descendants[activity_id] = frozenset(ids)
+            return descendants[activity_id]
+
+        for activity_id in activities:
+            collect(activity_id)
+        return activities, children, descendants
+
+    async def load(self, db: AsyncSession) -> None:
+        """Загрузить дерево из БД"""
+        # Версия читается до дерева: загруженное дерево не старше нее
+        versions = await data_versions(db, ACTIVITY_TABLES)
+        activities, children, descendants = await self._fetch(db)
+        self._activities = activities
+        self._children = children
+        self._descendants = descendants
+        self._loaded_at = time.monotonic()
+        self._version = versions["activities"]
+        self._stale = False
+        logger.info("Дерево деятельностей загружено: %d", len(activities))
+
+    def invalidate(self) -> None:
+        """Пометить кэш устаревшим, он перезагрузится при обращении"""
+        self._stale = True
+
+    def _is_fresh(self, version: Optional[int] = None) -> bool:
+        if not self.enabled or self._stale or self._loaded_at is None:
+            return False
+        # Запись в своем воркере сбрасывает дерево после фиксации, в других
+        # дерево устаревает по TTL. Если запрос уже знает версию activities
+        # (ETag), дерево старше нее перезагружается сразу: иначе под новым
+        # ETag ушло бы старое дерево. Дерево новее версии запроса (чтение
+        # с отстающей реплики) устаревшим не считается
+        if version is not None and version > self._version:
+            return False
+        return time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    async def _ensure_fresh(self, db: AsyncSession) -> None:
+        """Перезагрузить устаревшее дерево; свежее - без запросов к БД"""
+        version = self._known_version(db)
+        if self._is_fresh(version):
+            self.hits += 1
+            return
+
+        self.misses += 1
+        async with self._lock:
+            # Пока ждали блокировку, дерево мог перезагрузить другой запрос
+            if not self._is_fresh(version):
+                await self.load(db)
+
+    async def descendants(
+        self, db: AsyncSession, activity_id: int
+    ) -> FrozenSet[int]:
+        """ID деятельности и всех ее потомков"""
+        if not self.enabled:
+            # Без кэша: дерево собирается для запроса, без общей блокировки
+            _, _, descendants = await self._fetch(db)
+        else:
+            await self._ensure_fresh(db)
+            descendants = self._descendants
+        return descendants.get(activity_id, frozenset({activity_id}))
+
+    async def levels(self, db: AsyncSession) -> Dict[str, List[dict]]:
+        """Деятельности, сгруппированные по уровням вложенности"""
+        if not self.enabled:
+            activities, _, _ = await self._fetch(db)
+        else:
+            await self._ensure_fresh(db)
+            activities = self._activities
+        tree = {"level_1": [], "level_2": [], "level_3": []}
+        for activity in activities.values():
+            key = f"level_{activity['level']}"
+            if key in tree:
+                tree[key].append(dict(activity))
+        return tree
+
+    def stats(self) -> dict:
+        """Метрики кэша: попадания, промахи и возраст загрузки"""
+        age = None
+        if self._loaded_at is not None:
+            age = round(time.monotonic() - self._loaded_at, 3)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "activities": len(self._activities),
+            "stale": not self._is_fresh(),
+            "last_refresh_age_seconds": age
+        }
+
+
+activity_tree = ActivityTree(
+    ttl_seconds=settings.ACTIVITY_TREE_TTL_SECONDS,
+    enabled=settings.ACTIVITY_TREE_CACHE_ENABLED
+)
+
+
+# Флаг в session.info: в транзакции сессии менялись activities
+_ACTIVITIES_CHANGED = "activities_changed"
+
+
+@event.listens_for(Activity, "after_insert")
+@event.listens_for(Activity, "after_update")
+@event.listens_for(Activity, "after_delete")
+def _mark_activities_changed(mapper, connection, target):
+    """Запись в activities отмечается в сессии, а не сбрасывает кэш.
+
+    Событие приходит во время flush, до фиксации: сброшенное сейчас дерево
+    перезагрузилось бы одновременным запросом со старыми данными.
+    """
+    session = object_session(target)
+    if session is not None:
+        session.info[_ACTIVITIES_CHANGED] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_activity_tree(session):
+    """Сбросить кэш дерева после фиксации записи в activities"""
+    if session.info.pop(_ACTIVITIES_CHANGED, False):
+        activity_tree.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_activities_changes(session):
+    session.info.pop(_ACTIVITIES_CHANGED, None)
@@ -1,44 +1,51 @@
-from typing import List
+from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 from app.models.building import Building
 from app.models.organization import Organization
+from app.core.config import settings
+from app.core.singleflight import coalesced
+from app.services.loading import load_organizations
+from app.services.pagination import ORDER_BY_ID, paginate
 
 
 class BuildingService:
     """Сервис для работы со зданиями"""
 
+    def __init__(self, flat_reads: bool = settings.ORGANIZATION_FLAT_READS):
+        self.flat_reads = flat_reads
+
     async def get_all(
         self,
         db: AsyncSession,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[Building]:
         """Список всех зданий"""
         result = await db.execute(
-            select(Building)
-            .offset(skip)
-            .limit(limit)
+            paginate(
+                select(Building), Building, ORDER_BY_ID, cursor, skip, limit
+            )
         )
         return result.scalars().all()
 
+    @coalesced("building_organizations")
     async def get_organizations(
         self,
         db: AsyncSession,
         building_id: int,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[Organization]:
         """Список организаций в конкретном здании"""
-        result = await db.execute(
+        query = (
             select(Organization)
-            .options(
-                selectinload(Organization.activities),
-                selectinload(Organization.phones)
-            )
             .where(Organization.building_id == building_id)
-            .offset(skip)
-            .limit(limit)
         )
-        return result.scalars().all()
+        return await load_organizations(
+            db,
+            paginate(query, Organization, ORDER_BY_ID, cursor, skip, limit),
+            self.flat_reads
+        )
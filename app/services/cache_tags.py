@@ -0,0 +1,56 @@
+from typing import Any, Callable, Iterable, List, Set
+
+# Тег любых списков организаций, состав которых может поменять любая
+# запись (общий список, поиск по названию и по области)
+ORGANIZATIONS_TAG = "organizations"
+BUILDINGS_TAG = "buildings"
+
+
+def organization_tag(organization_id: int) -> str:
+    return f"org:{organization_id}"
+
+
+def building_tag(building_id: int) -> str:
+    return f"building:{building_id}"
+
+
+def activity_tag(activity_id: int) -> str:
+    return f"activity:{activity_id}"
+
+
+def _field(obj: Any, name: str) -> Any:
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def organization_tags(organization: Any) -> Set[str]:
+    """Теги записей кэша, которые затрагивает изменение организации"""
+    tags = {
+        organization_tag(_field(organization, "id")),
+        building_tag(_field(organization, "building_id")),
+    }
+    for activity in _field(organization, "activities") or []:
+        tags.add(activity_tag(_field(activity, "id")))
+    return tags
+
+
+def write_tags(
+    building_ids: Iterable[int] = (),
+    activity_ids: Iterable[int] = ()
+) -> Set[str]:
+    """Теги, сбрасываемые при создании или изменении организации"""
+    tags = {ORGANIZATIONS_TAG}
+    tags.update(building_tag(building_id) for building_id in building_ids)
+    tags.update(activity_tag(activity_id) for activity_id in activity_ids)
+    return tags
+
+
+def list_tags(*scope: str) -> Callable[[Any], Set[str]]:
+    """Теги результата: теги выборки и каждой организации в нем"""
+    def tags(value: Any) -> Set[str]:
+        items: List[Any] = value if isinstance(value, list) else [value]
+        return set(scope) | {
+            organization_tag(item["id"]) for item in items
+        }
+    return tags
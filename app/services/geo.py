@@ -0,0 +1,261 @@
+import math
+from typing import Iterable, List, NamedTuple, Set, Tuple
+from sqlalchemy import Float, and_, func, or_, type_coerce
+from app.models.building import Building
+
+# Средний радиус Земли в метрах
+EARTH_RADIUS_M = 6371000
+
+# Размер ячейки пространственной сетки в градусах (~1.1 км по широте).
+# Должен совпадать с выражением колонки buildings.geo_cell в миграции.
+GEO_CELL_SIZE = 0.01
+GEO_CELL_COLUMNS = 36000  # 360 / GEO_CELL_SIZE
+GEO_CELL_ROWS = 18000  # 180 / GEO_CELL_SIZE
+
+# Если радиус покрывает больше строк сетки, сужаем только по полосе широт
+MAX_GEO_CELL_ROWS = 128
+
+# Поиск ближайших: стартовый радиус и множитель его расширения.
+# Дальше половины окружности Земли точек нет
+NEAREST_START_RADIUS_M = 500
+NEAREST_RADIUS_GROWTH = 2
+MAX_DISTANCE_M = math.pi * EARTH_RADIUS_M
+
+# Кластеры на карте: ячеек на ширину тайла 256px (~32px на кластер)
+# и предел числа ячеек во вьюпорте, после которого ячейки укрупняются
+CLUSTER_CELLS_PER_TILE = 8
+MAX_CLUSTER_CELLS = 2500
+
+# Предел широты проекции Web Mercator (тайлы z/x/y)
+MAX_MERCATOR_LATITUDE = 85.0511287798
+
+# Запас на погрешность вычислений с плавающей точкой на границе бокса
+_BBOX_EPSILON = 1e-9
+
+
+class BoundingBox(NamedTuple):
+    """Ограничивающий прямоугольник вокруг окружности поиска"""
+    min_latitude: float
+    max_latitude: float
+    # Один диапазон долгот или два, если бокс пересекает антимеридиан
+    longitude_ranges: List[Tuple[float, float]]
+
+
+def bounding_box(
+    latitude: float, longitude: float, radius_m: float
+) -> BoundingBox:
+    """Прямоугольник, гарантированно содержащий окружность радиуса radius_m"""
+    angular = radius_m / EARTH_RADIUS_M
+    d_lat = math.degrees(angular) + _BBOX_EPSILON
+
+    min_lat = latitude - d_lat
+    max_lat = latitude + d_lat
+
+    # Окружность захватывает полюс или весь шар - нужны все долготы
+    if min_lat <= -90 or max_lat >= 90 or angular >= math.pi / 2:
+        return BoundingBox(
+            max(min_lat, -90.0), min(max_lat, 90.0), [(-180.0, 180.0)]
+        )
+
+    # Размах по долготе растет к полюсам пропорционально 1 / cos(широты)
+    ratio = math.sin(angular) / math.cos(math.radians(latitude))
+    if ratio >= 1:
+        return BoundingBox(min_lat, max_lat, [(-180.0, 180.0)])
+    d_lon = math.degrees(math.asin(ratio)) + _BBOX_EPSILON
+
+    min_lon = longitude - d_lon
+    max_lon = longitude + d_lon
+
+    if min_lon < -180:
+        ranges = [(min_lon + 360, 180.0), (-180.0, max_lon)]
+    elif max_lon > 180:
+        ranges = [(min_lon, 180.0), (-180.0, max_lon - 360)]
+    else:
+        ranges = [(min_lon, max_lon)]
+
+    return BoundingBox(min_lat, max_lat, ranges)
+
+
+def _cell_row(latitude: float) -> int:
+    row = math.floor((latitude + 90) / GEO_CELL_SIZE)
+    return min(max(row, 0), GEO_CELL_ROWS)
+
+
+def _cell_column(longitude: float) -> int:
+    column = math.floor((longitude + 180) / GEO_CELL_SIZE)
+    return min(max(column, 0), GEO_CELL_COLUMNS - 1)
+
+
+def geo_cell(latitude: float, longitude: float) -> int:
+    """Номер ячейки сетки для точки (как в колонке buildings.geo_cell)"""
+    return _cell_row(latitude) * GEO_CELL_COLUMNS + _cell_column(longitude)
+
+
+def geo_cell_ranges(bbox: BoundingBox) -> List[Tuple[int, int]]:
+    """Диапазоны номеров ячеек, покрывающие прямоугольник"""
+    first_row = _cell_row(bbox.min_latitude)
+    last_row = _cell_row(bbox.max_latitude)
+
+    # Слишком много строк - одна полоса широт вместо сотни диапазонов
+    if last_row - first_row + 1 > MAX_GEO_CELL_ROWS:
+        return [(
+            first_row * GEO_CELL_COLUMNS,
+            last_row * GEO_CELL_COLUMNS + GEO_CELL_COLUMNS - 1
+        )]
+
+    ranges = []
+    for row in range(first_row, last_row + 1):
+        for min_lon, max_lon in bbox.longitude_ranges:
+            ranges.append((
+                row * GEO_CELL_COLUMNS + _cell_column(min_lon),
+                row * GEO_CELL_COLUMNS + _cell_column(max_lon)
+            ))
+
+    # Склеиваем смежные диапазоны (например, при охвате всех долгот)
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def distance_expr(latitude: float, longitude: float):
+    """SQL-выражение расстояния от точки до здания (формула Haversine)"""
+    lat_diff = func.radians(Building.latitude - latitude) / 2
+    lon_diff = func.radians(Building.longitude - longitude) / 2
+    # Без явного типа SQLAlchemy выводит его из целого EARTH_RADIUS_M, и
+    # параметры сравнения с расстоянием (курсор) связывались бы как целые
+    return type_coerce(
+        2 * EARTH_RADIUS_M * func.asin(
+            func.sqrt(
+                func.power(func.sin(lat_diff), 2) +
+                func.cos(func.radians(latitude)) *
+                func.cos(func.radians(Building.latitude)) *
+                func.power(func.sin(lon_diff), 2)
+            )
+        ),
+        Float
+    )
+
+
+def bounding_box_filter(bbox: BoundingBox):
+    """Условие попадания здания в прямоугольник по индексу (lat, lon)"""
+    return and_(
+        Building.latitude.between(bbox.min_latitude, bbox.max_latitude),
+        or_(*[
+            Building.longitude.between(min_lon, max_lon)
+            for min_lon, max_lon in bbox.longitude_ranges
+        ])
+    )
+
+
+def geo_cell_filter(bbox: BoundingBox):
+    """Условие отбора кандидатов по индексу buildings.geo_cell"""
+    return or_(*[
+        Building.geo_cell.between(start, end)
+        for start, end in geo_cell_ranges(bbox)
+    ])
+
+
+def rectangle_prefilter(
+    min_latitude: float,
+    max_latitude: float,
+    min_longitude: float,
+    max_longitude: float
+):
+    """Индексный фильтр зданий в прямоугольнике"""
+    bbox = BoundingBox(
+        min_latitude, max_latitude, [(min_longitude, max_longitude)]
+    )
+    return and_(geo_cell_filter(bbox), bounding_box_filter(bbox))
+
+
+def cluster_cell_size(
+    zoom: int,
+    min_latitude: float,
+    max_latitude: float,
+    min_longitude: float,
+    max_longitude: float
+) -> float:
+    """Размер ячейки кластеризации в градусах для уровня масштаба"""
+    size = 360 / 2 ** zoom / CLUSTER_CELLS_PER_TILE
+    cells = (
+        max((max_latitude - min_latitude) / size, 1)
+        * max((max_longitude - min_longitude) / size, 1)
+    )
+    if cells > MAX_CLUSTER_CELLS:
+        size *= math.sqrt(cells / MAX_CLUSTER_CELLS)
+    return size
+
+
+def radius_prefilter(latitude: float, longitude: float, radius_m: float):
+    """Индексный предфильтр кандидатов перед точным расчетом расстояния"""
+    bbox = bounding_box(latitude, longitude, radius_m)
+    return and_(geo_cell_filter(bbox), bounding_box_filter(bbox))
+
+
+class TileBounds(NamedTuple):
+    """Границы тайла: широты (south, north], долготы [west, east)"""
+    south: float
+    north: float
+    west: float
+    east: float
+
+
+def _tile_latitude(y: int, n: int) -> float:
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+
+
+def tile_bounds(z: int, x: int, y: int) -> TileBounds:
+    """Географические границы тайла z/x/y"""
+    n = 2 ** z
+    return TileBounds(
+        south=_tile_latitude(y + 1, n),
+        north=_tile_latitude(y, n),
+        west=x / n * 360 - 180,
+        east=(x + 1) / n * 360 - 180
+    )
+
+
+def tile_for_point(
+    latitude: float, longitude: float, z: int
+) -> Tuple[int, int, int]:
+    """Тайл z/x/y, в который попадает точка"""
+    n = 2 ** z
+    latitude = min(
+        max(latitude, -MAX_MERCATOR_LATITUDE), MAX_MERCATOR_LATITUDE
+    )
+    x = math.floor((longitude + 180) / 360 * n)
+    y = math.floor(
+        (1 - math.asinh(math.tan(math.radians(latitude))) / math.pi) / 2 * n
+    )
+    return z, min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_for_points(
+    points: Iterable[Tuple[float, float]], zooms: Iterable[int]
+) -> Set[Tuple[int, int, int]]:
+    """Тайлы всех уровней масштаба, содержащие точки"""
+    zooms = list(zooms)
+    return {
+        tile_for_point(latitude, longitude, z)
+        for latitude, longitude in points
+        for z in zooms
+    }
+
+
+def tile_filter(bounds: TileBounds):
+    """Условие попадания здания в тайл: индексный фильтр и точные границы"""
+    return and_(
+        rectangle_prefilter(
+            bounds.south, bounds.north, bounds.west, bounds.east
+        ),
+        Building.latitude > bounds.south,
+        Building.latitude <= bounds.north,
+        Building.longitude >= bounds.west,
+        Building.longitude < bounds.east
+    )
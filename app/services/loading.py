@@ -0,0 +1,77 @@
+from typing import List, Union
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects.postgresql import JSON, aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import Select
+from app.models.activity import Activity
+from app.models.associations import organization_activities
+from app.models.organization import Organization, OrganizationPhone
+
+
+def _json_array(*fields, order_by):
+    """json_agg из объектов {поле: значение}, пустой массив вместо NULL"""
+    pairs = []
+    for field in fields:
+        pairs.extend([field.key, field])
+    return func.coalesce(
+        func.json_agg(
+            aggregate_order_by(func.json_build_object(*pairs), order_by)
+        ),
+        literal_column("'[]'::json"),
+        type_=JSON
+    )
+
+
+def flat_columns() -> list:
+    """Колонки организации с телефонами и деятельностями, собранными в SQL"""
+    phones = (
+        select(
+            _json_array(
+                OrganizationPhone.id,
+                OrganizationPhone.phone_number,
+                order_by=OrganizationPhone.id
+            )
+        )
+        .where(OrganizationPhone.organization_id == Organization.id)
+        .scalar_subquery()
+    )
+    activities = (
+        select(
+            _json_array(Activity.id, Activity.name, order_by=Activity.id)
+        )
+        .select_from(
+            organization_activities.join(
+                Activity, Activity.id == organization_activities.c.activity_id
+            )
+        )
+        .where(organization_activities.c.organization_id == Organization.id)
+        .scalar_subquery()
+    )
+    return [
+        Organization.id,
+        Organization.name,
+        Organization.building_id,
+        phones.label("phones"),
+        activities.label("activities")
+    ]
+
+
+async def load_organizations(
+    db: AsyncSession, query: Select, flat: bool
+) -> List[Union[Organization, dict]]:
+    """Выполнить запрос организаций вместе с телефонами и деятельностями"""
+    # Плоский путь: один запрос, словари в форме схемы Organization
+    # без ORM-объектов и identity map
+    if flat:
+        result = await db.execute(query.with_only_columns(*flat_columns()))
+        return [dict(row) for row in result.mappings()]
+
+    # ORM-путь: связи подгружаются двумя дополнительными запросами
+    result = await db.execute(
+        query.options(
+            selectinload(Organization.activities),
+            selectinload(Organization.phones)
+        )
+    )
+    return result.scalars().all()
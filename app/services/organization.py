@@ -1,133 +1,299 @@
-from typing import List, Optional, Set
+from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import Integer, cast, exists, func, select
 from app.models.organization import Organization
 from app.models.building import Building
 from app.models.activity import Activity
 from app.models.associations import organization_activities
+from app.core.config import settings
+from app.core.singleflight import coalesced
+from app.services import geo
+from app.services.activity_tree import activity_tree
+from app.services.loading import load_organizations
+from app.services.pagination import (
+    ORDER_BY_ID,
+    ORDER_BY_NAME,
+    InvalidCursor,
+    paginate,
+    paginate_by
+)
 
 
 class OrganizationService:
     """Сервис для работы с организациями"""
 
+    def __init__(self, flat_reads: bool = settings.ORGANIZATION_FLAT_READS):
+        # Плоское чтение: связи агрегируются в SQL, без ORM-объектов
+        self.flat_reads = flat_reads
+
+    def _name_filter(self, text: str):
+        """Поиск подстроки в названии, обслуживается триграммным индексом"""
+        # Экранируем спецсимволы LIKE, чтобы ввод искался буквально
+        escaped = (
+            text.replace("\\", "\\\\")
+            .replace("%", "\\%")
+            .replace("_", "\\_")
+        )
+        return Organization.name.ilike(f"%{escaped}%", escape="\\")
+
     async def get_all(
-        self, db: AsyncSession, skip: int = 0, limit: int = 100
+        self,
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[Organization]:
         """Получить все организации"""
-        result = await db.execute(
-            select(Organization)
-            .options(
-                selectinload(Organization.activities),
-                selectinload(Organization.phones)
-            )
-            .offset(skip)
-            .limit(limit)
+        return await load_organizations(
+            db,
+            paginate(
+                select(Organization), Organization, ORDER_BY_ID,
+                cursor, skip, limit
+            ),
+            self.flat_reads
         )
-        return result.scalars().all()
 
     async def get_by_id(
-        self, db: AsyncSession, organization_id: int
+        self,
+        db: AsyncSession,
+        organization_id: int,
+        flat: Optional[bool] = None
     ) -> Organization:
         """Получить организацию по ID"""
-        result = await db.execute(
-            select(Organization)
-            .options(
-                selectinload(Organization.activities),
-                selectinload(Organization.phones)
-            )
-            .where(Organization.id == organization_id)
+        if flat is None:
+            flat = self.flat_reads
+        organizations = await load_organizations(
+            db,
+            select(Organization).where(Organization.id == organization_id),
+            flat
         )
-        return result.scalar_one_or_none()
+        return organizations[0] if organizations else None
 
+    async def get_batch(
+        self,
+        db: AsyncSession,
+        organization_ids: List[int]
+    ) -> dict:
+        """Организации по списку ID одним запросом, в порядке запроса"""
+        requested = list(dict.fromkeys(organization_ids))
+        organizations = await load_organizations(
+            db,
+            select(Organization).where(Organization.id.in_(requested)),
+            self.flat_reads
+        )
+        by_id = {
+            (item["id"] if self.flat_reads else item.id): item
+            for item in organizations
+        }
+        return {
+            "organizations": [
+                organization
+                for organization in map(by_id.get, requested)
+                if organization is not None
+            ],
+            "missing_ids": [
+                organization_id for organization_id in requested
+                if organization_id not in by_id
+            ]
+        }
+
+    @coalesced("search")
     async def search_by_name(
-        self, db: AsyncSession, name: str, skip: int = 0, limit: int = 100
+        self,
+        db: AsyncSession,
+        name: str,
+        skip: int = 0,
+        limit: int = 100,
+        ranked: bool = False,
+        cursor: Optional[str] = None
     ) -> List[Organization]:
         """Поиск организаций по названию"""
-        result = await db.execute(
+        query = (
             select(Organization)
-            .options(
-                selectinload(Organization.activities),
-                selectinload(Organization.phones)
-            )
-            .where(Organization.name.ilike(f"%{name}%"))
-            .offset(skip)
-            .limit(limit)
+            .where(self._name_filter(name))
         )
-        return result.scalars().all()
 
+        if ranked:
+            # Порядок по похожести не монотонен по ключу - только OFFSET
+            if cursor:
+                raise InvalidCursor(
+                    "Курсор не поддерживается для ранжированного поиска"
+                )
+            # Сначала наиболее похожие названия (pg_trgm word_similarity)
+            query = (
+                query.order_by(
+                    func.word_similarity(name, Organization.name).desc(),
+                    Organization.id
+                )
+                .offset(skip)
+                .limit(limit)
+            )
+        else:
+            query = paginate(
+                query, Organization, ORDER_BY_NAME, cursor, skip, limit
+            )
+
+        return await load_organizations(db, query, self.flat_reads)
+
+    @coalesced("activity")
     async def get_by_activity(
         self,
         db: AsyncSession,
         activity_id: int,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[Organization]:
         """Список организаций, относящихся к указанной деятельности"""
-        result = await db.execute(
+        query = (
             select(Organization)
-            .options(
-                selectinload(Organization.activities),
-                selectinload(Organization.phones)
-            )
             .join(
                 organization_activities,
                 Organization.id == organization_activities.c.organization_id,
             )
             .where(organization_activities.c.activity_id == activity_id)
-            .offset(skip)
-            .limit(limit)
         )
-        return result.scalars().all()
-
-    async def _get_activity_tree_ids(
-        self, db: AsyncSession, activity_id: int
-    ) -> Set[int]:
-        """Получить все ID деятельностей в дереве (включая родительскую)"""
-        activity_ids = {activity_id}
+        return await load_organizations(
+            db,
+            paginate(query, Organization, ORDER_BY_ID, cursor, skip, limit),
+            self.flat_reads
+        )
 
-        result = await db.execute(
+    def _activity_tree_ids(self, activity_ids: List[int]):
+        """Подзапрос с ID деятельностей и всех их потомков (WITH RECURSIVE)"""
+        tree = (
             select(Activity.id)
-            .where(Activity.parent_id == activity_id)
+            .where(Activity.id.in_(activity_ids))
+            .cte("activity_tree", recursive=True)
         )
-        child_ids = [row[0] for row in result.all()]
+        tree = tree.union_all(
+            select(Activity.id).where(Activity.parent_id == tree.c.id)
+        )
+        return select(tree.c.id)
 
-        for child_id in child_ids:
-            child_tree_ids = await self._get_activity_tree_ids(db, child_id)
-            activity_ids.update(child_tree_ids)
+    async def _expand_activity_ids(
+        self, db: AsyncSession, activity_ids: List[int]
+    ):
+        """ID деятельностей вместе со всеми потомками по дереву"""
+        if not activity_tree.enabled:
+            return self._activity_tree_ids(activity_ids)
+        expanded = set()
+        for activity_id in activity_ids:
+            expanded.update(await activity_tree.descendants(db, activity_id))
+        return sorted(expanded)
 
-        return activity_ids
+    def _activity_filter(self, activity_ids):
+        """Полусоединение EXISTS: организация не дублируется в выборке"""
+        # Свой псевдоним таблицы связей и явная корреляция только с
+        # organizations: внешний запрос может сам соединяться с
+        # organization_activities (разбивка кластеров по деятельностям)
+        links = organization_activities.alias("activity_filter")
+        return exists().where(
+            links.c.organization_id == Organization.id,
+            links.c.activity_id.in_(activity_ids)
+        ).correlate(Organization)
 
+    @coalesced("activity_tree")
     async def get_by_activity_tree(
         self,
         db: AsyncSession,
         activity_id: int,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[Organization]:
         """Поиск организаций по дереву деятельности (включая дочерние)"""
+        # Потомки берутся из кэша дерева без обращения к БД; без кэша
+        # дерево разворачивается рекурсивным CTE в том же запросе
+        activity_ids = await self._expand_activity_ids(db, [activity_id])
 
-        activity_ids = await self._get_activity_tree_ids(db, activity_id)
+        # Полусоединение: организация с несколькими деятельностями из
+        # поддерева попадает в выборку один раз
+        query = select(Organization).where(
+            self._activity_filter(activity_ids)
+        )
+        return await load_organizations(
+            db,
+            paginate(query, Organization, ORDER_BY_ID, cursor, skip, limit),
+            self.flat_reads
+        )
 
-        if not activity_ids:
-            return []
+    @coalesced("nearest")
+    async def find_nearest(
+        self,
+        db: AsyncSession,
+        latitude: float,
+        longitude: float,
+        k: int = 10,
+        activity_ids: Optional[List[int]] = None,
+        search_text: Optional[str] = None
+    ) -> List[Organization]:
+        """k ближайших к точке организаций с расстоянием distance_m"""
+        distance = geo.distance_expr(latitude, longitude)
+        query = (
+            select(Organization.id, distance.label("distance"))
+            .join(Building, Organization.building_id == Building.id)
+            .order_by(distance, Organization.id)
+            .limit(k)
+        )
+        # Фильтр по видам деятельности с учетом дочерних
+        if activity_ids:
+            query = query.where(self._activity_filter(
+                await self._expand_activity_ids(db, activity_ids)
+            ))
+        if search_text:
+            query = query.where(self._name_filter(search_text))
 
-        result = await db.execute(
-            select(Organization)
-            .options(
-                selectinload(Organization.activities),
-                selectinload(Organization.phones)
-            )
-            .join(
-                organization_activities,
-                Organization.id == organization_activities.c.organization_id,
+        # Расширяем радиус, пока в нем не найдется k организаций: все, что
+        # ближе k-й найденной, тоже лежит в радиусе, поэтому результат
+        # точный, а каждый шаг читает только ячейки сетки вокруг точки
+        radius_m = geo.NEAREST_START_RADIUS_M
+        while True:
+            rows = (await db.execute(
+                query.where(
+                    geo.radius_prefilter(latitude, longitude, radius_m),
+                    distance <= radius_m
+                )
+            )).all()
+            if len(rows) >= k or radius_m >= geo.MAX_DISTANCE_M:
+                break
+            radius_m = min(
+                radius_m * geo.NEAREST_RADIUS_GROWTH, geo.MAX_DISTANCE_M
             )
-            .where(organization_activities.c.activity_id.in_(activity_ids))
-            .offset(skip)
-            .limit(limit)
+
+        return await self._load_with_distance(db, rows)
+
+    async def _load_with_distance(self, db: AsyncSession, rows) -> list:
+        """Организации по строкам (id, distance) в их порядке"""
+        if not rows:
+            return []
+        organizations = await load_organizations(
+            db,
+            select(Organization).where(
+                Organization.id.in_([row.id for row in rows])
+            ),
+            self.flat_reads
         )
-        return result.scalars().all()
+        by_id = {
+            (item["id"] if self.flat_reads else item.id): item
+            for item in organizations
+        }
+        result = []
+        for row in rows:
+            # Организацию могли удалить между запросом расстояний и этой
+            # выборкой: каждое выражение видит свой снимок (READ COMMITTED)
+            organization = by_id.get(row.id)
+            if organization is None:
+                continue
+            # Не колонка модели: атрибут только для сериализации ответа
+            if self.flat_reads:
+                organization["distance_m"] = row.distance
+            else:
+                organization.distance_m = row.distance
+            result.append(organization)
+        return result
 
+    @coalesced("radius")
     async def find_within_radius(
         self,
         db: AsyncSession,
@@ -136,54 +302,45 @@ class OrganizationService:
         radius_m: float,
         activity_ids: Optional[List[int]] = None,
         search_text: Optional[str] = None,
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include_child_activities: bool = False
     ) -> List[Organization]:
-        """Поиск организаций в радиусе от точки"""
-        # Константа радиуса Земли в метрах
-        R = 6371000
-
-        # Формула Haversine для расчета расстояния
-        lat_diff = func.radians(Building.latitude - latitude) / 2
-        lon_diff = func.radians(Building.longitude - longitude) / 2
-        distance_expr = (
-            2 * R * func.asin(
-                func.sqrt(
-                    func.power(func.sin(lat_diff), 2) +
-                    func.cos(func.radians(latitude)) *
-                    func.cos(func.radians(Building.latitude)) *
-                    func.power(func.sin(lon_diff), 2)
-                )
-            )
-        )
+        """Поиск организаций в радиусе от точки с расстоянием distance_m"""
+        distance = geo.distance_expr(latitude, longitude)
 
         query = (
-            select(Organization, distance_expr.label('distance'))
-            .options(
-                selectinload(Organization.activities),
-                selectinload(Organization.phones)
-            )
+            select(Organization.id, distance.label("distance"))
             .join(Building, Organization.building_id == Building.id)
-            .where(distance_expr <= radius_m)
-            .order_by('distance')
-            .limit(limit)
+            # Сначала сужаем кандидатов по индексам ячеек сетки и
+            # (latitude, longitude), точное расстояние считаем только для них
+            .where(
+                geo.radius_prefilter(latitude, longitude, radius_m),
+                distance <= radius_m
+            )
         )
 
         # Фильтр по видам деятельности
         if activity_ids:
-            query = query.join(
-                organization_activities,
-                Organization.id == organization_activities.c.organization_id
-            ).where(
-                organization_activities.c.activity_id.in_(activity_ids)
-            )
+            if include_child_activities:
+                activity_ids = await self._expand_activity_ids(
+                    db, activity_ids
+                )
+            query = query.where(self._activity_filter(activity_ids))
 
         # Фильтр по названию
         if search_text:
-            query = query.where(Organization.name.ilike(f"%{search_text}%"))
+            query = query.where(self._name_filter(search_text))
 
-        result = await db.execute(query)
-        return [row[0] for row in result.all()]
+        # Страницы по (расстояние, id): следующая начинается сразу за
+        # последней строкой предыдущей, без повторной сортировки начала
+        query = paginate_by(
+            query, [distance, Organization.id], cursor, 0, limit
+        )
+        rows = (await db.execute(query)).all()
+        return await self._load_with_distance(db, rows)
 
+    @coalesced("rectangle")
     async def find_within_rectangle(
         self,
         db: AsyncSession,
@@ -193,15 +350,12 @@ class OrganizationService:
         max_longitude: float,
         activity_ids: Optional[List[int]] = None,
         search_text: Optional[str] = None,
-        limit: int = 100
+        limit: int = 100,
+        include_child_activities: bool = False
     ) -> List[Organization]:
         """Поиск организаций в прямоугольной области"""
         query = (
             select(Organization)
-            .options(
-                selectinload(Organization.activities),
-                selectinload(Organization.phones)
-            )
             .join(Building, Organization.building_id == Building.id)
             .where(
                 Building.latitude.between(min_latitude, max_latitude),
@@ -212,19 +366,108 @@ class OrganizationService:
 
         # Фильтр по видам деятельности
         if activity_ids:
-            query = query.join(
-                organization_activities,
-                Organization.id == organization_activities.c.organization_id
-            ).where(
-                organization_activities.c.activity_id.in_(activity_ids)
-            )
+            if include_child_activities:
+                activity_ids = await self._expand_activity_ids(
+                    db, activity_ids
+                )
+            query = query.where(self._activity_filter(activity_ids))
 
         # Фильтр по названию
         if search_text:
-            query = query.where(Organization.name.ilike(f"%{search_text}%"))
+            query = query.where(self._name_filter(search_text))
+
+        return await load_organizations(db, query, self.flat_reads)
+
+    @coalesced("clusters")
+    async def get_clusters(
+        self,
+        db: AsyncSession,
+        min_latitude: float,
+        max_latitude: float,
+        min_longitude: float,
+        max_longitude: float,
+        zoom: int,
+        activity_ids: Optional[List[int]] = None,
+        search_text: Optional[str] = None
+    ) -> dict:
+        """Кластеры организаций по ячейкам сетки, агрегированные в БД"""
+        cell_size = geo.cluster_cell_size(
+            zoom, min_latitude, max_latitude, min_longitude, max_longitude
+        )
+        cell_y = cast(
+            func.floor(Building.latitude / cell_size), Integer
+        ).label("cell_y")
+        cell_x = cast(
+            func.floor(Building.longitude / cell_size), Integer
+        ).label("cell_x")
+
+        filters = [geo.rectangle_prefilter(
+            min_latitude, max_latitude, min_longitude, max_longitude
+        )]
+        if activity_ids:
+            filters.append(self._activity_filter(
+                await self._expand_activity_ids(db, activity_ids)
+            ))
+        if search_text:
+            filters.append(self._name_filter(search_text))
+
+        result = await db.execute(
+            select(
+                cell_y,
+                cell_x,
+                func.count(Organization.id).label("count"),
+                func.avg(Building.latitude).label("latitude"),
+                func.avg(Building.longitude).label("longitude"),
+                func.min(Organization.id).label("organization_id")
+            )
+            .join(Building, Organization.building_id == Building.id)
+            .where(*filters)
+            .group_by(cell_y, cell_x)
+        )
+        clusters = {}
+        for row in result.all():
+            clusters[(row.cell_y, row.cell_x)] = {
+                "latitude": row.latitude,
+                "longitude": row.longitude,
+                "count": row.count,
+                "organization_id": (
+                    row.organization_id if row.count == 1 else None
+                ),
+                "min_latitude": row.cell_y * cell_size,
+                "max_latitude": (row.cell_y + 1) * cell_size,
+                "min_longitude": row.cell_x * cell_size,
+                "max_longitude": (row.cell_x + 1) * cell_size,
+                "activities": []
+            }
+
+        # Разбивка по деятельностям - вторым агрегатом по тем же ячейкам
+        activity_id = organization_activities.c.activity_id
+        result = await db.execute(
+            select(
+                cell_y,
+                cell_x,
+                activity_id,
+                func.count().label("count")
+            )
+            .select_from(Organization)
+            .join(Building, Organization.building_id == Building.id)
+            .join(
+                organization_activities,
+                Organization.id == organization_activities.c.organization_id
+            )
+            .where(*filters)
+            .group_by(cell_y, cell_x, activity_id)
+            .order_by(cell_y, cell_x, func.count().desc(), activity_id)
+        )
+        for row in result.all():
+            cluster = clusters.get((row.cell_y, row.cell_x))
+            if cluster is not None:
+                cluster["activities"].append({
+                    "activity_id": row.activity_id,
+                    "count": row.count
+                })
 
-        result = await db.execute(query)
-        return result.scalars().all()
+        return {"cell_size": cell_size, "clusters": list(clusters.values())}
 
     async def create(self, db: AsyncSession, data: dict) -> Organization:
         """Создать новую организацию"""
@@ -238,7 +481,7 @@ class OrganizationService:
         self, db: AsyncSession, organization_id: int, data: dict
     ) -> Organization:
         """Обновить организацию"""
-        organization = await self.get_by_id(db, organization_id)
+        organization = await self.get_by_id(db, organization_id, flat=False)
         if not organization:
             return None
 
@@ -251,7 +494,7 @@ class OrganizationService:
 
     async def delete(self, db: AsyncSession, organization_id: int) -> bool:
         """Удалить организацию"""
-        organization = await self.get_by_id(db, organization_id)
+        organization = await self.get_by_id(db, organization_id, flat=False)
         if not organization:
             return False
 
@@ -0,0 +1,140 @@
+import base64
+import json
+from decimal import Decimal
+from typing import Any, Optional, Sequence, Tuple
+from sqlalchemy import BigInteger, Integer, SmallInteger, tuple_
+from sqlalchemy.sql import Select
+
+# Заголовок ответа с курсором следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Ключи сортировки списков: последним всегда идет id для стабильности
+ORDER_BY_ID = ("id",)
+ORDER_BY_NAME = ("name", "id")
+# Результаты поиска по радиусу: по расстоянию до точки
+ORDER_BY_DISTANCE = ("distance_m", "id")
+
+# Наибольшее целое в курсоре по типу колонки: значение вне диапазона
+# integer (id таблиц) БД отвергла бы ошибкой, а не пустой выборкой
+MAX_SMALLINT = 2 ** 15 - 1
+MAX_INTEGER = 2 ** 31 - 1
+MAX_BIGINT = 2 ** 63 - 1
+
+
+class InvalidCursor(ValueError):
+    """Некорректный или поддельный курсор пагинации"""
+
+
+def encode_cursor(*values: Any) -> str:
+    """Непрозрачный курсор из значений ключа сортировки"""
+    raw = json.dumps(
+        list(values), ensure_ascii=False, separators=(",", ":")
+    ).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _max_int(column: Any) -> int:
+    column_type = getattr(column, "type", None)
+    if isinstance(column_type, BigInteger):
+        return MAX_BIGINT
+    if isinstance(column_type, SmallInteger):
+        return MAX_SMALLINT
+    if isinstance(column_type, Integer):
+        return MAX_INTEGER
+    return MAX_BIGINT
+
+
+def _value_spec(column: Any) -> Tuple[Tuple[type, ...], int]:
+    """Допустимые в курсоре типы значения и наибольшее целое по модулю"""
+    try:
+        python_type = column.type.python_type
+    except (AttributeError, NotImplementedError):
+        # Тип выражения неизвестен: ключи сортировки здесь - числа
+        return (int, float), MAX_BIGINT
+    if python_type in (float, Decimal):
+        # В JSON курсора 1.0 и 1 не различаются
+        return (int, float), MAX_BIGINT
+    return (python_type,), _max_int(column)
+
+
+def decode_cursor(
+    cursor: str, specs: Sequence[Tuple[Tuple[type, ...], int]]
+) -> list:
+    """Значения ключа сортировки из курсора.
+
+    specs - допустимые типы каждого значения и наибольшее целое для него:
+    поддельный курсор со строкой вместо числа или id вне диапазона
+    колонки дает InvalidCursor, а не ошибку БД.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError:
+        raise InvalidCursor("Некорректный курсор пагинации")
+
+    if not isinstance(values, list) or len(values) != len(specs):
+        raise InvalidCursor("Некорректный курсор пагинации")
+    for value, (allowed, max_int) in zip(values, specs):
+        # bool - подкласс int, а null сравнение в SQL не проходит
+        if isinstance(value, bool) or not isinstance(value, allowed):
+            raise InvalidCursor("Некорректный курсор пагинации")
+        if isinstance(value, int) and abs(value) > max_int:
+            raise InvalidCursor("Некорректный курсор пагинации")
+    return values
+
+
+def paginate(
+    query: Select,
+    model: Any,
+    keys: Sequence[str],
+    cursor: Optional[str],
+    skip: int,
+    limit: int
+) -> Select:
+    """Сортировка по ключу и keyset-условие (или OFFSET без курсора)"""
+    columns = [getattr(model, key) for key in keys]
+    return paginate_by(query, columns, cursor, skip, limit)
+
+
+def paginate_by(
+    query: Select,
+    columns: Sequence[Any],
+    cursor: Optional[str],
+    skip: int,
+    limit: int
+) -> Select:
+    """То же, что paginate, для произвольных выражений сортировки"""
+    query = query.order_by(*columns)
+    if cursor:
+        values = decode_cursor(
+            cursor, [_value_spec(column) for column in columns]
+        )
+        query = query.where(tuple_(*columns) > tuple_(*values))
+    else:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def _key_value(item: Any, key: str) -> Any:
+    if isinstance(item, dict):
+        return item[key]
+    return getattr(item, key)
+
+
+def next_cursor(
+    items: Sequence, limit: int, keys: Sequence[str]
+) -> Optional[str]:
+    """Курсор следующей страницы или None, если страница последняя"""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(*(_key_value(last, key) for key in keys))
+
+
+def set_next_cursor(
+    response: Any, items: Sequence, limit: int, keys: Sequence[str]
+) -> None:
+    """Передать курсор следующей страницы в заголовке ответа"""
+    cursor = next_cursor(items, limit, keys)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
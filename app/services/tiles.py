@@ -0,0 +1,196 @@
+import logging
+from typing import Iterable, List, Optional, Tuple
+import orjson
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.building import Building
+from app.models.map_tile import MapTile
+from app.models.organization import Organization
+from app.models.associations import organization_activities
+from app.services import geo
+
+logger = logging.getLogger(__name__)
+
+Tile = Tuple[int, int, int]
+
+# Поля ключа advisory-блокировки тайла: x и y меньше 2^25 до 25 уровня
+TILE_LOCK_BITS = 25
+
+
+def tile_lock_key(z: int, x: int, y: int) -> int:
+    """Ключ pg_advisory_xact_lock тайла (bigint)"""
+    return (z << (2 * TILE_LOCK_BITS)) | (x << TILE_LOCK_BITS) | y
+
+
+class TileService:
+    """Сервис предрассчитанных тайлов карты"""
+
+    def __init__(
+        self,
+        session_factory,
+        min_zoom: int = settings.TILE_MIN_ZOOM,
+        max_zoom: int = settings.TILE_MAX_ZOOM
+    ):
+        # Фоновые перестроения идут в собственной сессии основной БД
+        self.session_factory = session_factory
+        self.zooms = range(min_zoom, max_zoom + 1)
+
+    def is_valid(self, z: int, x: int, y: int) -> bool:
+        """Тайл существует и его уровень масштаба предрассчитывается"""
+        return z in self.zooms and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+    async def render(
+        self, db: AsyncSession, z: int, x: int, y: int
+    ) -> dict:
+        """Точки тайла: [id, широта, долгота, [id деятельностей]]"""
+        activity_ids = func.array_remove(
+            func.array_agg(organization_activities.c.activity_id), None
+        )
+        result = await db.execute(
+            select(
+                Organization.id,
+                Building.latitude,
+                Building.longitude,
+                activity_ids.label("activity_ids")
+            )
+            .join(Building, Organization.building_id == Building.id)
+            .outerjoin(
+                organization_activities,
+                Organization.id == organization_activities.c.organization_id
+            )
+            .where(geo.tile_filter(geo.tile_bounds(z, x, y)))
+            .group_by(Organization.id, Building.latitude, Building.longitude)
+            .order_by(Organization.id)
+        )
+        points = [
+            [row.id, row.latitude, row.longitude, sorted(row.activity_ids)]
+            for row in result.all()
+        ]
+        return {"z": z, "x": x, "y": y, "points": points}
+
+    async def get(
+        self, db: AsyncSession, z: int, x: int, y: int
+    ) -> Optional[bytes]:
+        """Сохраненный тайл или None, если он еще не собран"""
+        return await db.scalar(
+            select(MapTile.payload).where(
+                MapTile.z == z, MapTile.x == x, MapTile.y == y
+            )
+        )
+
+    async def _lock(self, db: AsyncSession, z: int, x: int, y: int) -> None:
+        """Блокировка тайла до конца транзакции.
+
+        Сохранения одного тайла выполняются по очереди, и каждое собирает
+        его уже под блокировкой: последним фиксируется самый свежий тайл,
+        а не тот, чья сборка началась позже.
+        """
+        await db.execute(
+            select(func.pg_advisory_xact_lock(tile_lock_key(z, x, y)))
+        )
+
+    async def _save(
+        self, db: AsyncSession, tile: dict, payload: bytes, replace: bool
+    ) -> None:
+        if not tile["points"]:
+            # Пустые тайлы не хранятся: иначе обход пространства тайлов
+            # запросами растил бы map_tiles без ограничений
+            await db.execute(
+                delete(MapTile).where(
+                    MapTile.z == tile["z"],
+                    MapTile.x == tile["x"],
+                    MapTile.y == tile["y"]
+                )
+            )
+            return
+        statement = insert(MapTile).values(
+            z=tile["z"],
+            x=tile["x"],
+            y=tile["y"],
+            payload=payload,
+            organizations=len(tile["points"])
+        )
+        index = [MapTile.z, MapTile.x, MapTile.y]
+        if replace:
+            statement = statement.on_conflict_do_update(
+                index_elements=index,
+                set_={
+                    "payload": statement.excluded.payload,
+                    "organizations": statement.excluded.organizations,
+                    "updated_at": func.now()
+                }
+            )
+        else:
+            statement = statement.on_conflict_do_nothing(
+                index_elements=index
+            )
+        await db.execute(statement)
+
+    async def store(self, z: int, x: int, y: int) -> None:
+        """Фоновая задача: сохранить тайл, которого еще нет в таблице.
+
+        Тайл собирается заново в основной БД под блокировкой: отданный
+        клиенту мог быть прочитан с отстающей реплики. Существующий тайл
+        не перезаписывается.
+        """
+        try:
+            async with self.session_factory() as db:
+                await self._lock(db, z, x, y)
+                if await self.get(db, z, x, y) is None:
+                    tile = await self.render(db, z, x, y)
+                    await self._save(
+                        db, tile, orjson.dumps(tile), replace=False
+                    )
+                await db.commit()
+        except Exception:
+            logger.exception("Не удалось сохранить тайл")
+
+    async def rebuild(self, db: AsyncSession, tiles: Iterable[Tile]) -> int:
+        """Пересобрать и сохранить тайлы.
+
+        Блокировки тайлов берутся по возрастанию (z, x, y) и держатся до
+        фиксации, поэтому одновременные перестроения не взаимоблокируются.
+        """
+        count = 0
+        for z, x, y in sorted(tiles):
+            await self._lock(db, z, x, y)
+            tile = await self.render(db, z, x, y)
+            await self._save(db, tile, orjson.dumps(tile), replace=True)
+            count += 1
+        await db.commit()
+        return count
+
+    async def rebuild_for_buildings(
+        self, building_ids: Iterable[Optional[int]]
+    ) -> None:
+        """Фоновая задача: пересобрать тайлы, содержащие здания"""
+        building_ids = {
+            building_id for building_id in building_ids
+            if building_id is not None
+        }
+        if not building_ids:
+            return
+        try:
+            async with self.session_factory() as db:
+                result = await db.execute(
+                    select(Building.latitude, Building.longitude)
+                    .where(Building.id.in_(building_ids))
+                )
+                tiles = geo.tiles_for_points(result.all(), self.zooms)
+                count = await self.rebuild(db, tiles)
+            logger.info("Перестроено тайлов: %d", count)
+        except Exception:
+            # Тайл останется прежним до следующей записи или полной сборки
+            logger.exception("Не удалось перестроить тайлы")
+
+    async def tiles_with_buildings(self, db: AsyncSession) -> List[Tile]:
+        """Все тайлы предрассчитываемых уровней, где есть здания"""
+        result = await db.stream(
+            select(Building.latitude, Building.longitude)
+        )
+        tiles = set()
+        async for partition in result.partitions(10000):
+            tiles.update(geo.tiles_for_points(partition, self.zooms))
+        return sorted(tiles)
@@ -0,0 +1,110 @@
+"""
+Бенчмарк фильтра по видам деятельности в поиске по радиусу: JOIN с
+organization_activities против полусоединения EXISTS. Организации
+привязаны к нескольким деятельностям из фильтра, поэтому JOIN
+возвращает дубликаты. Выводит число строк, уникальных организаций и
+задержку.
+
+Запуск: python -m benchmarks.activity_filter
+"""
+import asyncio
+import random
+from sqlalchemy import exists, select
+from app.models.associations import organization_activities
+from app.models.building import Building
+from app.models.organization import Organization
+from app.services import geo
+from benchmarks.common import (
+    MAX_LATITUDE,
+    MAX_LONGITUDE,
+    MIN_LATITUDE,
+    MIN_LONGITUDE,
+    create_engine,
+    create_session_factory,
+    fill_activities,
+    fill_buildings,
+    fill_organizations,
+    measure,
+    reset_schema
+)
+
+ORGANIZATIONS = 200_000
+BUILDINGS = 20_000
+ACTIVITIES = 20
+ACTIVITIES_PER_ORGANIZATION = 5
+FILTER_ACTIVITY_IDS = list(range(1, 11))
+RADIUS_M = 3000
+LIMIT = 100
+
+
+def radius_query(latitude, longitude, activity_filter):
+    """ID организаций в радиусе по возрастанию расстояния"""
+    distance = geo.distance_expr(latitude, longitude)
+    query = (
+        select(Organization.id)
+        .join(Building, Organization.building_id == Building.id)
+        .where(
+            geo.radius_prefilter(latitude, longitude, RADIUS_M),
+            distance <= RADIUS_M
+        )
+        .order_by(distance)
+        .limit(LIMIT)
+    )
+    return activity_filter(query)
+
+
+def join_filter(query):
+    """Прежняя реализация: JOIN с таблицей связей"""
+    return query.join(
+        organization_activities,
+        Organization.id == organization_activities.c.organization_id
+    ).where(organization_activities.c.activity_id.in_(FILTER_ACTIVITY_IDS))
+
+
+def exists_filter(query):
+    """Новая реализация: полусоединение EXISTS"""
+    return query.where(exists().where(
+        organization_activities.c.organization_id == Organization.id,
+        organization_activities.c.activity_id.in_(FILTER_ACTIVITY_IDS)
+    ))
+
+
+async def run():
+    engine = create_engine()
+    session_factory = create_session_factory(engine)
+    rng = random.Random(42)
+
+    await reset_schema(engine)
+    await fill_buildings(engine, BUILDINGS)
+    await fill_organizations(engine, ORGANIZATIONS, BUILDINGS)
+    await fill_activities(engine, ACTIVITIES, ACTIVITIES_PER_ORGANIZATION)
+
+    def random_point():
+        return (
+            rng.uniform(MIN_LATITUDE, MAX_LATITUDE),
+            rng.uniform(MIN_LONGITUDE, MAX_LONGITUDE)
+        )
+
+    filters = {"JOIN": join_filter, "EXISTS": exists_filter}
+    async with session_factory() as db:
+        latitude, longitude = random_point()
+        for name, activity_filter in filters.items():
+            result = await db.execute(
+                radius_query(latitude, longitude, activity_filter)
+            )
+            ids = result.scalars().all()
+            print(f"{name}: {len(ids)} строк, {len(set(ids))} организаций")
+
+        for name, activity_filter in filters.items():
+            async def call():
+                await db.execute(
+                    radius_query(*random_point(), activity_filter)
+                )
+
+            print(f"  {name}: {await measure(call)}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
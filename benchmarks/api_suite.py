@@ -0,0 +1,398 @@
+"""
+Сквозной бенчмарк API: для каждого размера набора данных база
+бенчмарков заполняется заново, app.main:app запускается в uvicorn
+поверх нее, и каждый сценарий прогоняется на нескольких уровнях
+параллельности. Для каждого сценария считаются p50/p95/p99 и
+пропускная способность.
+
+Запуск:
+    python -m benchmarks.api_suite --output results.json
+    python -m benchmarks.api_suite --output new.json --baseline results.json
+
+С --baseline результаты сравниваются с сохраненным прогоном. Код
+возврата 1, если p95 вырос или пропускная способность упала больше
+чем на --threshold процентов.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+import httpx
+from benchmarks.common import (
+    BENCHMARK_DATABASE_URL,
+    MAX_LATITUDE,
+    MAX_LONGITUDE,
+    MIN_LATITUDE,
+    MIN_LONGITUDE,
+    create_engine,
+    fill_activities,
+    fill_activity_tree,
+    fill_buildings,
+    fill_organizations,
+    percentile,
+    reset_schema
+)
+
+SIZES = [10_000, 100_000]
+CONCURRENCY_LEVELS = [1, 10, 50]
+REQUESTS_PER_LEVEL = 500
+# Организаций на здание и деятельностей в наборе
+ORGANIZATIONS_PER_BUILDING = 10
+ACTIVITIES = 1_000
+ROOT_ACTIVITIES = 100
+
+API_KEY = os.getenv("API_KEY", "static_api_key")
+STARTUP_TIMEOUT_SECONDS = 30
+
+# Сценарий: (метод, путь, параметры запроса, тело) для случайного запроса
+Request = Tuple[str, str, Optional[dict], Optional[dict]]
+Scenario = Callable[[random.Random, int], Request]
+
+
+def _point(rng: random.Random) -> Tuple[float, float]:
+    return (
+        rng.uniform(MIN_LATITUDE, MAX_LATITUDE),
+        rng.uniform(MIN_LONGITUDE, MAX_LONGITUDE)
+    )
+
+
+def get_all(rng: random.Random, size: int) -> Request:
+    return (
+        "GET", "/api/v1/organizations/",
+        {"skip": rng.randrange(0, 1000), "limit": 100}, None
+    )
+
+
+def search_by_name(rng: random.Random, size: int) -> Request:
+    # Имена организаций содержат md5, ищем случайный фрагмент
+    fragment = "".join(rng.choices("0123456789abcdef", k=4))
+    return (
+        "GET", "/api/v1/organizations/",
+        {"search": fragment, "limit": 100}, None
+    )
+
+
+def get_by_activity_tree(rng: random.Random, size: int) -> Request:
+    activity_id = rng.randint(1, ROOT_ACTIVITIES)
+    return (
+        "GET", f"/api/v1/organizations/by-activity-tree/{activity_id}/",
+        {"limit": 100}, None
+    )
+
+
+def find_within_radius(rng: random.Random, size: int) -> Request:
+    latitude, longitude = _point(rng)
+    return (
+        "POST", "/api/v1/organizations/search/radius", None,
+        {
+            "latitude": latitude, "longitude": longitude,
+            "radius_m": 1000, "limit": 100
+        }
+    )
+
+
+def find_within_rectangle(rng: random.Random, size: int) -> Request:
+    latitude, longitude = _point(rng)
+    return (
+        "POST", "/api/v1/organizations/search/rectangle", None,
+        {
+            "min_latitude": latitude, "max_latitude": latitude + 0.02,
+            "min_longitude": longitude, "max_longitude": longitude + 0.03,
+            "limit": 100
+        }
+    )
+
+
+def get_buildings(rng: random.Random, size: int) -> Request:
+    return (
+        "GET", "/api/v1/buildings/",
+        {"skip": rng.randrange(0, 1000), "limit": 100}, None
+    )
+
+
+def get_building_organizations(rng: random.Random, size: int) -> Request:
+    building_id = rng.randint(1, buildings_for(size))
+    return (
+        "GET", f"/api/v1/buildings/{building_id}/organizations",
+        {"limit": 100}, None
+    )
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "get_all": get_all,
+    "search_by_name": search_by_name,
+    "get_by_activity_tree": get_by_activity_tree,
+    "find_within_radius": find_within_radius,
+    "find_within_rectangle": find_within_rectangle,
+    "get_buildings": get_buildings,
+    "get_building_organizations": get_building_organizations,
+}
+
+
+def buildings_for(size: int) -> int:
+    return max(size // ORGANIZATIONS_PER_BUILDING, 1)
+
+
+async def seed(size: int) -> None:
+    """Заполнить базу бенчмарков набором из size организаций"""
+    engine = create_engine()
+    await reset_schema(engine)
+    await fill_buildings(engine, buildings_for(size))
+    await fill_organizations(engine, size, buildings_for(size))
+    await fill_activities(engine, ACTIVITIES, 3)
+    await fill_activity_tree(engine, ROOT_ACTIVITIES)
+    await engine.dispose()
+
+
+def start_server(port: int, response_cache: bool) -> subprocess.Popen:
+    """uvicorn с app.main:app поверх базы бенчмарков"""
+    env = {
+        **os.environ,
+        "DATABASE_URL": BENCHMARK_DATABASE_URL,
+        "API_KEY": API_KEY,
+        "RESPONSE_CACHE_ENABLED": str(response_cache).lower(),
+    }
+    env.pop("DATABASE_READ_URL", None)
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--port", str(port), "--log-level", "warning"
+        ],
+        env=env
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient) -> None:
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        try:
+            response = await client.get("/api/v1/health")
+            if response.status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Сервер не запустился")
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    size: int,
+    concurrency: int,
+    requests: int,
+    rng: random.Random
+) -> dict:
+    """requests запросов сценария силами concurrency клиентов"""
+    planned = [scenario(rng, size) for _ in range(requests)]
+    timings: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while planned:
+            method, path, params, body = planned.pop()
+            started = time.perf_counter()
+            try:
+                response = await client.request(
+                    method, path, params=params, json=body
+                )
+                response.raise_for_status()
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            timings.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(len(timings) / elapsed, 1),
+        "p50_ms": round(percentile(timings, 0.50), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+        "p99_ms": round(percentile(timings, 0.99), 3),
+    }
+
+
+async def run(args: argparse.Namespace) -> List[dict]:
+    results = []
+    for size in args.sizes:
+        print(f"Набор данных: {size} организаций")
+        await seed(size)
+        server = start_server(args.port, args.response_cache)
+        try:
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{args.port}",
+                headers={"Authorization": f"Bearer {API_KEY}"},
+                timeout=60,
+                limits=httpx.Limits(max_connections=max(args.concurrency))
+            ) as client:
+                await wait_ready(client)
+                for name in args.scenarios:
+                    rng = random.Random(args.seed)
+                    # Прогрев: пул соединений, кэш дерева деятельностей
+                    await run_level(
+                        client, SCENARIOS[name], size, 1, 10, rng
+                    )
+                    for concurrency in args.concurrency:
+                        result = {
+                            "size": size,
+                            "concurrency": concurrency,
+                            "scenario": name,
+                            **await run_level(
+                                client, SCENARIOS[name], size,
+                                concurrency, args.requests, rng
+                            )
+                        }
+                        results.append(result)
+                        print(
+                            f"  {name} c={concurrency}: "
+                            f"{result['throughput_rps']} rps, "
+                            f"p50={result['p50_ms']} мс, "
+                            f"p95={result['p95_ms']} мс, "
+                            f"p99={result['p99_ms']} мс, "
+                            f"ошибок={result['errors']}"
+                        )
+        finally:
+            server.terminate()
+            server.wait()
+    return results
+
+
+def _key(result: dict) -> tuple:
+    return result["size"], result["concurrency"], result["scenario"]
+
+
+def compare(
+    results: List[dict], baseline: List[dict], threshold: float
+) -> bool:
+    """Сравнить с базовым прогоном; False, если есть регрессии"""
+    previous = {_key(result): result for result in baseline}
+    ok = True
+    print("Сравнение с базовым прогоном (p95, пропускная способность):")
+    for result in results:
+        base = previous.get(_key(result))
+        if base is None:
+            continue
+        p95_change = _change(base["p95_ms"], result["p95_ms"])
+        rps_change = _change(base["throughput_rps"], result["throughput_rps"])
+        regression = p95_change > threshold or rps_change < -threshold
+        ok = ok and not regression
+        status = "РЕГРЕССИЯ" if regression else "ok"
+        size, concurrency, name = _key(result)
+        print(
+            f"  {status}: {name} size={size} c={concurrency}: "
+            f"p95 {base['p95_ms']} -> {result['p95_ms']} мс "
+            f"({p95_change:+.1f}%), "
+            f"{base['throughput_rps']} -> {result['throughput_rps']} rps "
+            f"({rps_change:+.1f}%)"
+        )
+    return ok
+
+
+def _change(before: float, after: float) -> float:
+    """Изменение в процентах"""
+    if not before:
+        return 0.0
+    return (after - before) / before * 100
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",")]
+
+
+def _scenario_list(value: str) -> List[str]:
+    names = value.split(",")
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"Неизвестные сценарии: {', '.join(sorted(unknown))}"
+        )
+    return names
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=_int_list, default=SIZES,
+        help="Размеры набора (число организаций) через запятую"
+    )
+    parser.add_argument(
+        "--concurrency", type=_int_list, default=CONCURRENCY_LEVELS,
+        help="Уровни параллельности через запятую"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=REQUESTS_PER_LEVEL,
+        help="Запросов на сценарий и уровень параллельности"
+    )
+    parser.add_argument(
+        "--scenarios", type=_scenario_list, default=list(SCENARIOS),
+        help="Сценарии через запятую: " + ", ".join(SCENARIOS)
+    )
+    parser.add_argument(
+        "--response-cache", action="store_true",
+        help="Не отключать кэш ответов (по умолчанию меряется путь до БД)"
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--output", default="api_suite.json",
+        help="Файл с результатами в JSON"
+    )
+    parser.add_argument("--baseline", help="Результаты базового прогона")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0,
+        help="Допустимое ухудшение относительно базового прогона, %%"
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    results = asyncio.run(run(args))
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "settings": {
+            "sizes": args.sizes,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "response_cache": args.response_cache,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты сохранены в {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        if not compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Бенчмарк получения организаций по списку ID: N последовательных
+get_by_id (как N запросов GET /organizations/{id}/) против одного
+get_batch (POST /organizations/batch).
+
+Запуск: python -m benchmarks.batch_lookup
+"""
+import asyncio
+import random
+from app.services.organization import OrganizationService
+from benchmarks.common import (
+    create_engine,
+    create_session_factory,
+    fill_activities,
+    fill_buildings,
+    fill_organizations,
+    measure,
+    reset_schema
+)
+
+ORGANIZATIONS = 100_000
+BUILDINGS = 10_000
+BATCH_SIZES = [10, 50, 200]
+
+
+async def run():
+    engine = create_engine()
+    session_factory = create_session_factory(engine)
+
+    await reset_schema(engine)
+    await fill_buildings(engine, BUILDINGS)
+    await fill_organizations(engine, ORGANIZATIONS, BUILDINGS)
+    await fill_activities(engine, 50, 3)
+
+    service = OrganizationService()
+    rng = random.Random(42)
+
+    for size in BATCH_SIZES:
+        ids = rng.sample(range(1, ORGANIZATIONS + 1), size)
+
+        async def sequential():
+            # Отдельная сессия на каждый ID, как у отдельных HTTP-запросов
+            for organization_id in ids:
+                async with session_factory() as db:
+                    await service.get_by_id(db, organization_id)
+
+        async def batch():
+            async with session_factory() as db:
+                await service.get_batch(db, ids)
+
+        print(f"{size} организаций")
+        print(f"  последовательно: {await measure(sequential, repeat=5)}")
+        print(f"  batch: {await measure(batch, repeat=5)}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,104 @@
+"""
+Проверка кластеров карты с фильтром по деятельностям: get_clusters
+выполняется на заполненной базе с activity_ids (с кэшем дерева и без
+него), и число организаций в кластерах сверяется с независимым
+SQL-запросом.
+
+Запуск: python -m benchmarks.clusters_check
+Код возврата 1 при ошибке запроса или расхождении.
+"""
+import asyncio
+import sys
+from unittest import mock
+from sqlalchemy import text
+from app.services.activity_tree import activity_tree
+from app.services.organization import OrganizationService
+from benchmarks.common import (
+    create_engine,
+    create_session_factory,
+    fill_activities,
+    fill_activity_tree,
+    fill_buildings,
+    fill_organizations,
+    reset_schema
+)
+
+ORGANIZATIONS = 20_000
+BUILDINGS = 2_000
+ACTIVITIES = 200
+ROOT_ACTIVITIES = 20
+FILTER_ACTIVITY_IDS = [1, 2]
+# Вьюпорт в центре Москвы и уровень масштаба карты
+BBOX = (55.70, 55.80, 37.50, 37.70)
+ZOOM = 13
+
+EXPECTED_SQL = """
+SELECT count(*)
+FROM organizations AS o
+JOIN buildings AS b ON b.id = o.building_id
+WHERE b.latitude BETWEEN :min_lat AND :max_lat
+  AND b.longitude BETWEEN :min_lon AND :max_lon
+  AND EXISTS (
+    SELECT 1 FROM organization_activities AS oa
+    JOIN activities AS a ON a.id = oa.activity_id
+    WHERE oa.organization_id = o.id
+      AND (a.id = ANY(:ids) OR a.parent_id = ANY(:ids))
+  )
+"""
+
+
+async def run() -> bool:
+    engine = create_engine()
+    session_factory = create_session_factory(engine)
+
+    await reset_schema(engine)
+    await fill_buildings(engine, BUILDINGS)
+    await fill_organizations(engine, ORGANIZATIONS, BUILDINGS)
+    await fill_activities(engine, ACTIVITIES, 3)
+    await fill_activity_tree(engine, ROOT_ACTIVITIES)
+
+    min_lat, max_lat, min_lon, max_lon = BBOX
+    async with session_factory() as db:
+        expected = await db.scalar(text(EXPECTED_SQL), {
+            "min_lat": min_lat, "max_lat": max_lat,
+            "min_lon": min_lon, "max_lon": max_lon,
+            "ids": FILTER_ACTIVITY_IDS,
+        })
+
+    service = OrganizationService()
+    ok = True
+    # С кэшем дерева ID потомков подставляются списком, без него
+    # дерево разворачивается рекурсивным CTE
+    for tree_cache in (True, False):
+        with mock.patch.object(activity_tree, "enabled", tree_cache):
+            try:
+                async with session_factory() as db:
+                    grid = await service.get_clusters(
+                        db, min_lat, max_lat, min_lon, max_lon, ZOOM,
+                        activity_ids=FILTER_ACTIVITY_IDS
+                    )
+            except Exception as e:
+                print(f"ОШИБКА (кэш дерева={tree_cache}): {e!r}")
+                ok = False
+                continue
+        total = sum(cluster["count"] for cluster in grid["clusters"])
+        broken = [
+            cluster for cluster in grid["clusters"]
+            if not cluster["activities"]
+        ]
+        passed = total == expected and not broken
+        ok = ok and passed
+        status = "OK" if passed else "РАСХОЖДЕНИЕ"
+        print(
+            f"{status} (кэш дерева={tree_cache}): "
+            f"{len(grid['clusters'])} кластеров, {total} организаций, "
+            f"ожидалось {expected}; без разбивки по деятельностям: "
+            f"{len(broken)}"
+        )
+
+    await engine.dispose()
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(run()) else 1)
@@ -0,0 +1,161 @@
+"""
+Общие утилиты для бенчмарков.
+
+Бенчмарки пересоздают схему, поэтому работают с отдельной базой,
+заданной переменной окружения BENCHMARK_DATABASE_URL.
+"""
+import math
+import os
+import statistics
+import time
+from typing import Awaitable, Callable, Dict, List
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+    async_sessionmaker
+)
+from app.models import Base
+
+BENCHMARK_DATABASE_URL = os.getenv(
+    "BENCHMARK_DATABASE_URL",
+    "postgresql+asyncpg://orgfinder_user:orgfinder_pass@"
+    "localhost:5432/orgfinder_bench"
+)
+
+# Примерные границы Москвы для генерации координат
+MIN_LATITUDE, MAX_LATITUDE = 55.55, 55.95
+MIN_LONGITUDE, MAX_LONGITUDE = 37.30, 37.90
+
+
+def create_engine() -> AsyncEngine:
+    """Движок для базы бенчмарков"""
+    return create_async_engine(BENCHMARK_DATABASE_URL, echo=False)
+
+
+def create_session_factory(engine: AsyncEngine):
+    """Фабрика сессий для базы бенчмарков"""
+    return async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+
+async def reset_schema(engine: AsyncEngine) -> None:
+    """Пересоздать все таблицы по текущим моделям"""
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def fill_buildings(engine: AsyncEngine, count: int) -> None:
+    """Сгенерировать здания со случайными координатами средствами БД"""
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO buildings (address, latitude, longitude) "
+                "SELECT 'Здание ' || g, "
+                ":min_lat + random() * (:max_lat - :min_lat), "
+                ":min_lon + random() * (:max_lon - :min_lon) "
+                "FROM generate_series(1, :count) AS g"
+            ),
+            {
+                "min_lat": MIN_LATITUDE, "max_lat": MAX_LATITUDE,
+                "min_lon": MIN_LONGITUDE, "max_lon": MAX_LONGITUDE,
+                "count": count,
+            }
+        )
+        await conn.execute(text("ANALYZE buildings"))
+
+
+async def fill_organizations(
+    engine: AsyncEngine, count: int, buildings: int
+) -> None:
+    """Сгенерировать организации с телефоном в случайных зданиях"""
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO organizations (name, building_id) "
+                "SELECT 'Организация ' || md5(g::text), "
+                "1 + floor(random() * :buildings)::integer "
+                "FROM generate_series(1, :count) AS g"
+            ),
+            {"count": count, "buildings": buildings}
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO organization_phones "
+                "(phone_number, organization_id) "
+                "SELECT '+7(495)' || lpad(id::text, 7, '0'), id "
+                "FROM organizations"
+            )
+        )
+        await conn.execute(text("ANALYZE organizations"))
+        await conn.execute(text("ANALYZE organization_phones"))
+
+
+async def fill_activities(
+    engine: AsyncEngine, count: int, per_organization: int
+) -> None:
+    """Создать деятельности и привязать к каждой организации несколько"""
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO activities (name, level) "
+                "SELECT 'Деятельность ' || g, 1 "
+                "FROM generate_series(1, :count) AS g"
+            ),
+            {"count": count}
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO organization_activities "
+                "(organization_id, activity_id) "
+                "SELECT o.id, 1 + (o.id + k) % :count "
+                "FROM organizations AS o, "
+                "generate_series(0, :per_organization - 1) AS k"
+            ),
+            {"count": count, "per_organization": per_organization}
+        )
+        await conn.execute(text("ANALYZE activities"))
+        await conn.execute(text("ANALYZE organization_activities"))
+
+
+async def fill_activity_tree(engine: AsyncEngine, roots: int) -> None:
+    """Сделать деятельности с id > roots дочерними для первых roots"""
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "UPDATE activities SET parent_id = 1 + (id - 1) % :roots, "
+                "level = 2 WHERE id > :roots"
+            ),
+            {"roots": roots}
+        )
+        await conn.execute(text("ANALYZE activities"))
+
+
+def percentile(timings: List[float], fraction: float) -> float:
+    """Перцентиль по рангу для отсортированного списка"""
+    if not timings:
+        return 0.0
+    index = max(math.ceil(len(timings) * fraction) - 1, 0)
+    return timings[index]
+
+
+async def measure(
+    call: Callable[[], Awaitable[object]], repeat: int = 50
+) -> Dict[str, float]:
+    """Задержка вызова в миллисекундах: медиана, p95 и среднее"""
+    await call()  # прогрев
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+    }
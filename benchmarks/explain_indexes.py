@@ -0,0 +1,119 @@
+"""
+Проверка планов горячих запросов: каждый должен читать свою таблицу по
+индексу, а не последовательным сканированием. Запросы собираются так
+же, как в сервисах, план берется из EXPLAIN (FORMAT JSON).
+
+Запуск: python -m benchmarks.explain_indexes
+Код возврата 1, если хотя бы один запрос не использует индекс. Те же
+проверки выполняет tests/test_explain_indexes.py, если задана
+BENCHMARK_DATABASE_URL.
+"""
+import asyncio
+import json
+import sys
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+from app.models.associations import organization_activities
+from app.models.organization import Organization, OrganizationPhone
+from app.services.organization import OrganizationService
+from benchmarks.common import (
+    create_engine,
+    fill_activities,
+    fill_activity_tree,
+    fill_buildings,
+    fill_organizations,
+    reset_schema
+)
+
+ORGANIZATIONS = 100_000
+BUILDINGS = 10_000
+# На десятках строк планировщик законно выбирает seq scan, поэтому
+# деятельностей больше, чем в реальном справочнике
+ACTIVITIES = 20_000
+ROOT_ACTIVITIES = 2_000
+
+INDEX_SCANS = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+
+def hot_queries():
+    """(описание, запрос, индекс, который должен использоваться)"""
+    service = OrganizationService()
+    return [
+        (
+            "BuildingService.get_organizations",
+            select(Organization.id).where(Organization.building_id == 42),
+            "ix_organizations_building_id"
+        ),
+        (
+            "selectinload телефонов",
+            select(OrganizationPhone).where(
+                OrganizationPhone.organization_id.in_([1, 2, 3])
+            ),
+            "ix_organization_phones_organization_id"
+        ),
+        (
+            "развертка дерева деятельностей (WITH RECURSIVE)",
+            service._activity_tree_ids([1]),
+            "ix_activities_parent_id"
+        ),
+        (
+            "get_by_activity",
+            select(organization_activities.c.organization_id).where(
+                organization_activities.c.activity_id == 1
+            ),
+            "ix_organization_activities_activity_id"
+        ),
+    ]
+
+
+def index_names(plan: dict) -> set:
+    """Имена индексов, которые читает план"""
+    names = set()
+    if plan.get("Node Type") in INDEX_SCANS:
+        names.add(plan.get("Index Name"))
+    for child in plan.get("Plans", []):
+        names |= index_names(child)
+    return names
+
+
+async def explain(conn, query) -> dict:
+    compiled = query.compile(
+        dialect=postgresql.dialect(),
+        compile_kwargs={"literal_binds": True}
+    )
+    result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+async def seed(engine) -> None:
+    """Пересоздать схему и заполнить данными, на которых план устойчив"""
+    await reset_schema(engine)
+    await fill_buildings(engine, BUILDINGS)
+    await fill_organizations(engine, ORGANIZATIONS, BUILDINGS)
+    await fill_activities(engine, ACTIVITIES, 3)
+    # Деревья: у каждой деятельности, кроме корневых, есть родитель
+    await fill_activity_tree(engine, ROOT_ACTIVITIES)
+
+
+async def run() -> bool:
+    engine = create_engine()
+    await seed(engine)
+
+    ok = True
+    async with engine.connect() as conn:
+        for description, query, index in hot_queries():
+            used = index_names(await explain(conn, query))
+            passed = index in used
+            ok = ok and passed
+            status = "OK" if passed else "НЕТ ИНДЕКСА"
+            print(f"{status}: {description} -> {index} (план: {used})")
+
+    await engine.dispose()
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(run()) else 1)
@@ -0,0 +1,65 @@
+"""
+Бенчмарк чтения организаций: ORM с selectinload против плоского
+чтения с json_agg. Замеряет задержку запроса и объем выделенной памяти.
+
+Запуск: python -m benchmarks.flat_reads
+"""
+import asyncio
+import tracemalloc
+from app.services.organization import OrganizationService
+from benchmarks.common import (
+    create_engine,
+    create_session_factory,
+    fill_activities,
+    fill_buildings,
+    fill_organizations,
+    measure,
+    reset_schema
+)
+
+ORGANIZATIONS = 100_000
+BUILDINGS = 10_000
+PAGE_SIZES = [10, 100, 1000]
+
+
+async def allocated_kib(call) -> float:
+    """Пиковый объем памяти, выделенной за один вызов, в КиБ"""
+    tracemalloc.start()
+    try:
+        await call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+async def run():
+    engine = create_engine()
+    session_factory = create_session_factory(engine)
+
+    await reset_schema(engine)
+    await fill_buildings(engine, BUILDINGS)
+    await fill_organizations(engine, ORGANIZATIONS, BUILDINGS)
+    await fill_activities(engine, 50, 3)
+
+    services = {
+        "orm": OrganizationService(flat_reads=False),
+        "flat": OrganizationService(flat_reads=True),
+    }
+
+    for limit in PAGE_SIZES:
+        print(f"Страница из {limit} организаций")
+        for name, service in services.items():
+            # Новая сессия на вызов, как в обработчике запроса
+            async def call():
+                async with session_factory() as db:
+                    await service.get_all(db, 0, limit)
+
+            timings = await measure(call)
+            print(f"  {name}: {timings}, {await allocated_kib(call)} КиБ")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
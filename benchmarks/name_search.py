@@ -0,0 +1,69 @@
+"""
+Бенчмарк поиска организаций по подстроке названия на 1M организаций:
+последовательное сканирование против триграммного GIN-индекса.
+
+Запуск: python -m benchmarks.name_search
+"""
+import asyncio
+import random
+from sqlalchemy import text
+from app.services.organization import OrganizationService
+from benchmarks.common import (
+    create_engine,
+    create_session_factory,
+    fill_buildings,
+    fill_organizations,
+    measure,
+    reset_schema
+)
+
+ORGANIZATIONS = 1_000_000
+BUILDINGS = 100_000
+HEX_DIGITS = "0123456789abcdef"
+
+
+async def run():
+    engine = create_engine()
+    session_factory = create_session_factory(engine)
+    service = OrganizationService()
+    rng = random.Random(42)
+
+    await reset_schema(engine)
+    await fill_buildings(engine, BUILDINGS)
+    await fill_organizations(engine, ORGANIZATIONS, BUILDINGS)
+
+    def random_term():
+        # Названия вида "Организация <md5>", ищем случайный кусок хэша
+        return "".join(rng.choice(HEX_DIGITS) for _ in range(5))
+
+    async def search(db, ranked=False):
+        await service.search_by_name(db, random_term(), ranked=ranked)
+
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP INDEX ix_organizations_name_trgm"))
+
+    async with session_factory() as db:
+        print(f"{ORGANIZATIONS} организаций")
+        print(f"  seq scan:     {await measure(lambda: search(db))}")
+
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "CREATE INDEX ix_organizations_name_trgm ON organizations "
+                "USING gin (name gin_trgm_ops)"
+            )
+        )
+        await conn.execute(text("ANALYZE organizations"))
+
+    async with session_factory() as db:
+        print(f"  trigram:      {await measure(lambda: search(db))}")
+        print(
+            f"  trigram rank: "
+            f"{await measure(lambda: search(db, ranked=True))}"
+        )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,61 @@
+"""
+Нагрузочный тест пула соединений: всплески параллельных запросов к
+запущенному API и состояние пула после каждого всплеска.
+
+Запуск: python -m benchmarks.pool_load --url http://localhost:8000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+CONCURRENCY_LEVELS = [10, 50, 100, 200]
+REQUESTS_PER_CLIENT = 20
+
+
+async def client_loop(client: httpx.AsyncClient, timings: list, errors: list):
+    for _ in range(REQUESTS_PER_CLIENT):
+        started = time.perf_counter()
+        try:
+            response = await client.get(
+                "/api/v1/organizations/", params={"limit": 50}
+            )
+            response.raise_for_status()
+            timings.append((time.perf_counter() - started) * 1000)
+        except httpx.HTTPError as e:
+            errors.append(str(e))
+
+
+async def run(url: str, api_key: str):
+    headers = {"Authorization": f"Bearer {api_key}"}
+    async with httpx.AsyncClient(
+        base_url=url, headers=headers, timeout=60
+    ) as client:
+        for concurrency in CONCURRENCY_LEVELS:
+            timings, errors = [], []
+            started = time.perf_counter()
+            await asyncio.gather(*[
+                client_loop(client, timings, errors)
+                for _ in range(concurrency)
+            ])
+            elapsed = time.perf_counter() - started
+
+            pool = (await client.get("/api/v1/health/pool")).json()
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1] if timings else 0
+            print(
+                f"concurrency={concurrency}: "
+                f"{len(timings) / elapsed:.1f} rps, "
+                f"p50={statistics.median(timings or [0]):.1f} мс, "
+                f"p95={p95:.1f} мс, ошибок={len(errors)}"
+            )
+            print(f"  пул: {pool}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--api-key", default="static_api_key")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.api_key))
@@ -0,0 +1,124 @@
+"""
+Бенчмарк поиска по радиусу: полный перебор Haversine против
+индексного предфильтра (ячейки сетки и прямоугольник по lat/lon).
+Перед замерами проверяет, что оба способа возвращают одинаковые
+организации.
+
+Запуск: python -m benchmarks.radius_search
+"""
+import asyncio
+import random
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from app.models.building import Building
+from app.models.organization import Organization
+from app.services import geo
+from app.services.organization import OrganizationService
+from app.services.pagination import ORDER_BY_DISTANCE, next_cursor
+from benchmarks.common import (
+    MAX_LATITUDE,
+    MAX_LONGITUDE,
+    MIN_LATITUDE,
+    MIN_LONGITUDE,
+    create_engine,
+    create_session_factory,
+    fill_buildings,
+    fill_organizations,
+    measure,
+    reset_schema
+)
+
+SIZES = [10_000, 100_000, 1_000_000]
+RADIUS_M = 1000
+CHECK_RADII_M = [50, 500, 5000, 50000]
+
+
+async def full_scan_radius(db, latitude, longitude, radius_m, limit=100):
+    """Прежняя реализация: Haversine для каждой строки buildings"""
+    distance = geo.distance_expr(latitude, longitude)
+    result = await db.execute(
+        select(Organization, distance.label('distance'))
+        .options(
+            selectinload(Organization.activities),
+            selectinload(Organization.phones)
+        )
+        .join(Building, Organization.building_id == Building.id)
+        .where(distance <= radius_m)
+        .order_by('distance')
+        .limit(limit)
+    )
+    return [row[0] for row in result.all()]
+
+
+async def verify_same_results(db, service, rng, checks=20):
+    """Результаты с предфильтром совпадают с полным перебором"""
+    for _ in range(checks):
+        latitude = rng.uniform(MIN_LATITUDE, MAX_LATITUDE)
+        longitude = rng.uniform(MIN_LONGITUDE, MAX_LONGITUDE)
+        for radius_m in CHECK_RADII_M:
+            expected = await full_scan_radius(
+                db, latitude, longitude, radius_m, limit=10**9
+            )
+            actual = await service.find_within_radius(
+                db, latitude, longitude, radius_m, limit=10**9
+            )
+            assert {o.id for o in expected} == {o.id for o in actual}, (
+                f"Расхождение для ({latitude}, {longitude}), {radius_m} м"
+            )
+
+            # Обход страницами по курсору дает ту же выборку и порядок
+            paged, cursor = [], None
+            while True:
+                page = await service.find_within_radius(
+                    db, latitude, longitude, radius_m, limit=7,
+                    cursor=cursor
+                )
+                paged.extend(page)
+                cursor = next_cursor(page, 7, ORDER_BY_DISTANCE)
+                if cursor is None:
+                    break
+            assert [o.id for o in paged] == [o.id for o in actual], (
+                f"Пагинация расходится для ({latitude}, {longitude})"
+            )
+
+
+async def run():
+    engine = create_engine()
+    session_factory = create_session_factory(engine)
+    service = OrganizationService()
+    rng = random.Random(42)
+
+    for size in SIZES:
+        await reset_schema(engine)
+        await fill_buildings(engine, size)
+        await fill_organizations(engine, size, size)
+
+        def random_point():
+            return (
+                rng.uniform(MIN_LATITUDE, MAX_LATITUDE),
+                rng.uniform(MIN_LONGITUDE, MAX_LONGITUDE)
+            )
+
+        async with session_factory() as db:
+            if size == SIZES[0]:
+                await verify_same_results(db, service, rng)
+
+            async def old():
+                latitude, longitude = random_point()
+                await full_scan_radius(db, latitude, longitude, RADIUS_M)
+
+            async def new():
+                latitude, longitude = random_point()
+                await service.find_within_radius(
+                    db, latitude, longitude, RADIUS_M
+                )
+
+            print(f"{size} зданий, радиус {RADIUS_M} м")
+            print(f"  full scan: {await measure(old)}")
+            print(f"  prefilter: {await measure(new)}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,80 @@
+"""
+Бенчмарк сериализации страницы организаций без БД: стандартный путь
+FastAPI (валидация response_model через from_attributes + json) против
+скомпилированного сериализатора с orjson.
+
+Запуск: python -m benchmarks.serialization [--profile]
+"""
+import argparse
+import cProfile
+import json
+import pstats
+import time
+from types import SimpleNamespace
+from typing import List
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+import orjson
+from app.core.serialization import serialize_organization
+from app.schemas.organization import Organization
+
+PAGE_SIZE = 1000
+ROUNDS = 50
+
+organizations_adapter = TypeAdapter(List[Organization])
+
+
+def make_page(size: int) -> list:
+    """Страница ORM-подобных объектов с телефонами и деятельностями"""
+    return [
+        SimpleNamespace(
+            id=i,
+            name=f"Организация {i}",
+            building_id=i % 100,
+            phones=[
+                SimpleNamespace(id=i * 3 + j, phone_number=f"+7(495){j}")
+                for j in range(2)
+            ],
+            activities=[
+                SimpleNamespace(id=j, name=f"Деятельность {j}")
+                for j in range(3)
+            ]
+        )
+        for i in range(size)
+    ]
+
+
+def pydantic_path(page: list) -> bytes:
+    """Как FastAPI: валидация response_model и стандартный json"""
+    validated = organizations_adapter.validate_python(
+        page, from_attributes=True
+    )
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def fast_path(page: list) -> bytes:
+    """Скомпилированный сериализатор и orjson"""
+    return orjson.dumps([serialize_organization(item) for item in page])
+
+
+def run(profile: bool) -> None:
+    page = make_page(PAGE_SIZE)
+    assert json.loads(pydantic_path(page)) == json.loads(fast_path(page))
+
+    for name, path in [("pydantic", pydantic_path), ("fast", fast_path)]:
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            path(page)
+        elapsed = (time.perf_counter() - started) / ROUNDS * 1000
+        print(f"{name}: {elapsed:.2f} мс на страницу из {PAGE_SIZE}")
+
+        if profile:
+            profiler = cProfile.Profile()
+            profiler.runcall(path, page)
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", action="store_true")
+    run(parser.parse_args().profile)
@@ -0,0 +1,41 @@
+"""
+Скрипт полной сборки тайлов карты (GET /api/v1/tiles/{z}/{x}/{y}).
+
+После записи организаций тайлы пересобираются точечно в фоне; полная
+сборка нужна после массовой загрузки данных или изменения уровней
+TILE_MIN_ZOOM/TILE_MAX_ZOOM.
+"""
+import asyncio
+from sqlalchemy import delete
+from app.db.database import AsyncSessionLocal
+from app.models.map_tile import MapTile
+from app.services.tiles import TileService
+
+# Тайлов в одной транзакции
+BATCH_SIZE = 500
+
+
+async def build_tiles():
+    """Пересобрать все тайлы, в которых есть здания"""
+    tile_service = TileService(AsyncSessionLocal)
+    async with AsyncSessionLocal() as session:
+        tiles = await tile_service.tiles_with_buildings(session)
+        print(f"Тайлов для сборки: {len(tiles)}")
+
+        # Тайлы, где зданий больше нет, не должны остаться в таблице.
+        # Удаление фиксируется сразу: иначе фоновое перестроение тайла
+        # ждало бы блокировку строки, удерживая блокировку тайла, нужную
+        # этой сборке
+        await session.execute(delete(MapTile))
+        await session.commit()
+        for start in range(0, len(tiles), BATCH_SIZE):
+            await tile_service.rebuild(
+                session, tiles[start:start + BATCH_SIZE]
+            )
+            print(f"Собрано {min(start + BATCH_SIZE, len(tiles))}")
+
+        print("Тайлы собраны!")
+
+
+if __name__ == "__main__":
+    asyncio.run(build_tiles())
@@ -0,0 +1,101 @@
+"""Add geo_cell spatial grid column to buildings
+
+Revision ID: buildings_geo_cell
+Revises: initial_migration
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'buildings_geo_cell'
+down_revision: Union[str, None] = 'initial_migration'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Ячейка сетки 0.01° x 0.01°: row * 36000 + column
+GEO_CELL_SQL = (
+    "LEAST(GREATEST(floor((latitude + 90) / 0.01::double precision), 0), "
+    "18000)::integer * 36000 + "
+    "LEAST(GREATEST(floor((longitude + 180) / 0.01::double precision), 0), "
+    "35999)::integer"
+)
+
+# Строк buildings в одной транзакции заполнения
+BACKFILL_BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    # Обычная колонка с триггером, а не GENERATED ... STORED: добавление
+    # генерируемой колонки переписывает таблицу под ACCESS EXCLUSIVE,
+    # а колонка без значения по умолчанию добавляется мгновенно
+    op.add_column(
+        'buildings', sa.Column('geo_cell', sa.Integer(), nullable=True)
+    )
+    op.execute(f"""
+        CREATE FUNCTION buildings_geo_cell(
+            latitude double precision, longitude double precision
+        ) RETURNS integer AS $$ SELECT {GEO_CELL_SQL} $$
+        LANGUAGE sql IMMUTABLE
+    """)
+    op.execute("""
+        CREATE FUNCTION buildings_set_geo_cell() RETURNS trigger AS $$
+        BEGIN
+            NEW.geo_cell := buildings_geo_cell(NEW.latitude, NEW.longitude);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER buildings_set_geo_cell
+        BEFORE INSERT OR UPDATE OF latitude, longitude ON buildings
+        FOR EACH ROW EXECUTE FUNCTION buildings_set_geo_cell()
+    """)
+
+    # Существующие строки заполняются пачками по id, каждая в своей
+    # транзакции: блокировки строк короткие, запись в таблицу не стоит.
+    # Новые строки уже заполняет триггер
+    backfill = (
+        "UPDATE buildings "
+        "SET geo_cell = buildings_geo_cell(latitude, longitude) "
+        "WHERE geo_cell IS NULL"
+    )
+    with op.get_context().autocommit_block():
+        if op.get_context().as_sql:
+            # В режиме --sql границы id неизвестны: один UPDATE
+            op.execute(backfill)
+        else:
+            max_id = op.get_bind().scalar(
+                sa.text('SELECT max(id) FROM buildings')
+            ) or 0
+            for start in range(0, max_id + 1, BACKFILL_BATCH_SIZE):
+                op.execute(
+                    f"{backfill} AND id >= {start} "
+                    f"AND id < {start + BACKFILL_BATCH_SIZE}"
+                )
+        op.create_index(
+            op.f('ix_buildings_geo_cell'), 'buildings', ['geo_cell'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            op.f('ix_buildings_geo_cell'),
+            table_name='buildings',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
+    op.execute('DROP TRIGGER buildings_set_geo_cell ON buildings')
+    op.execute('DROP FUNCTION buildings_set_geo_cell()')
+    op.execute(
+        'DROP FUNCTION buildings_geo_cell(double precision, double precision)'
+    )
+    op.drop_column('buildings', 'geo_cell')
@@ -0,0 +1,38 @@
+"""Add composite (latitude, longitude) index to buildings
+
+Revision ID: buildings_lat_lon_index
+Revises: buildings_geo_cell
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'buildings_lat_lon_index'
+down_revision: Union[str, None] = 'buildings_geo_cell'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY не блокирует запись в таблицу, но не работает внутри
+    # транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_buildings_latitude_longitude', 'buildings',
+            ['latitude', 'longitude'], unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_buildings_latitude_longitude', table_name='buildings',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
@@ -0,0 +1,104 @@
+"""Add updated_at columns and per-table data versions
+
+Revision ID: data_versions
+Revises: organizations_name_trgm
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'data_versions'
+down_revision: Union[str, None] = 'organizations_name_trgm'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Таблицы с колонкой updated_at
+UPDATED_AT_TABLES = ['buildings', 'organizations', 'activities']
+
+# Таблицы, изменения которых увеличивают версию данных
+VERSIONED_TABLES = [
+    'buildings',
+    'organizations',
+    'organization_phones',
+    'activities',
+    'organization_activities',
+]
+
+
+def upgrade() -> None:
+    for table in UPDATED_AT_TABLES:
+        op.add_column(
+            table,
+            sa.Column(
+                'updated_at',
+                sa.DateTime(timezone=True),
+                server_default=sa.text('now()'),
+                nullable=False
+            )
+        )
+
+    # updated_at обновляется и при записи в обход ORM
+    op.execute("""
+        CREATE FUNCTION set_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at = now();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table in UPDATED_AT_TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_set_updated_at
+            BEFORE UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION set_updated_at()
+        """)
+
+    op.create_table(
+        'data_versions',
+        sa.Column('table_name', sa.String(length=64), nullable=False),
+        sa.Column(
+            'version', sa.BigInteger(), server_default='0', nullable=False
+        ),
+        sa.PrimaryKeyConstraint('table_name')
+    )
+    op.bulk_insert(
+        sa.table('data_versions', sa.column('table_name', sa.String)),
+        [{'table_name': table} for table in VERSIONED_TABLES]
+    )
+
+    # Один инкремент на выражение, а не на строку: массовая запись
+    # стоит одного обновления версии
+    op.execute("""
+        CREATE FUNCTION bump_data_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO data_versions (table_name, version)
+            VALUES (TG_TABLE_NAME, 1)
+            ON CONFLICT (table_name)
+            DO UPDATE SET version = data_versions.version + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table in VERSIONED_TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_bump_data_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version()
+        """)
+
+
+def downgrade() -> None:
+    for table in VERSIONED_TABLES:
+        op.execute(f'DROP TRIGGER {table}_bump_data_version ON {table}')
+    op.execute('DROP FUNCTION bump_data_version()')
+    op.drop_table('data_versions')
+
+    for table in UPDATED_AT_TABLES:
+        op.execute(f'DROP TRIGGER {table}_set_updated_at ON {table}')
+        op.drop_column(table, 'updated_at')
+    op.execute('DROP FUNCTION set_updated_at()')
@@ -0,0 +1,93 @@
+"""Make data version bumps append-only to avoid a per-table row lock
+
+Revision ID: data_versions_append_only
+Revises: foreign_key_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'data_versions_append_only'
+down_revision: Union[str, None] = 'foreign_key_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Версия таблицы - сумма version ее строк. Триггер добавляет строку
+    # с 1 вместо UPDATE единственной строки: блокировка строки до
+    # коммита выстраивала всех пишущих в таблицу в очередь
+    op.drop_constraint('data_versions_pkey', 'data_versions')
+    op.add_column(
+        'data_versions',
+        sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False)
+    )
+    op.create_primary_key('data_versions_pkey', 'data_versions', ['id'])
+    op.create_index(
+        'ix_data_versions_table_name', 'data_versions', ['table_name']
+    )
+
+    # Свертка накопленных строк в одну с той же суммой. SKIP LOCKED:
+    # строки, которые сворачивает другая транзакция, пропускаются, так
+    # что пишущие друг друга не ждут. Сумма видимых строк меняется
+    # только при коммите записи, поэтому версия согласована со снимком
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_data_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO data_versions (table_name, version)
+            VALUES (TG_TABLE_NAME, 1);
+
+            WITH merged AS (
+                DELETE FROM data_versions
+                WHERE id IN (
+                    SELECT id FROM data_versions
+                    WHERE table_name = TG_TABLE_NAME
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING version
+            )
+            INSERT INTO data_versions (table_name, version)
+            SELECT TG_TABLE_NAME, sum(version) FROM merged
+            HAVING count(*) > 0;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_data_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO data_versions (table_name, version)
+            VALUES (TG_TABLE_NAME, 1)
+            ON CONFLICT (table_name)
+            DO UPDATE SET version = data_versions.version + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    # Обратно к одной строке на таблицу с суммарной версией
+    op.execute("""
+        CREATE TABLE data_versions_merged AS
+        SELECT table_name, sum(version)::bigint AS version
+        FROM data_versions GROUP BY table_name
+    """)
+    op.execute('DELETE FROM data_versions')
+    op.drop_index('ix_data_versions_table_name', 'data_versions')
+    op.drop_constraint('data_versions_pkey', 'data_versions')
+    op.drop_column('data_versions', 'id')
+    op.execute("""
+        INSERT INTO data_versions (table_name, version)
+        SELECT table_name, version FROM data_versions_merged
+    """)
+    op.execute('DROP TABLE data_versions_merged')
+    op.create_primary_key(
+        'data_versions_pkey', 'data_versions', ['table_name']
+    )
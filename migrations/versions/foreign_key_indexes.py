@@ -0,0 +1,68 @@
+"""Add indexes on foreign keys and organization_activities.activity_id
+
+Revision ID: foreign_key_indexes
+Revises: map_tiles
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'foreign_key_indexes'
+down_revision: Union[str, None] = 'map_tiles'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (имя индекса, таблица, колонки)
+INDEXES = [
+    (
+        'ix_organizations_building_id',
+        'organizations',
+        ['building_id']
+    ),
+    (
+        'ix_organization_phones_organization_id',
+        'organization_phones',
+        ['organization_id']
+    ),
+    (
+        'ix_activities_parent_id',
+        'activities',
+        ['parent_id']
+    ),
+    # Первичный ключ (organization_id, activity_id) не обслуживает поиск
+    # по activity_id; обратный порядок колонок дает index-only scan
+    (
+        'ix_organization_activities_activity_id',
+        'organization_activities',
+        ['activity_id', 'organization_id']
+    ),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY не блокирует запись в таблицы, но не работает внутри
+    # транзакции. IF NOT EXISTS - на случай повторного запуска после
+    # прерванной сборки (невалидный индекс нужно удалить вручную)
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True
+            )
@@ -0,0 +1,40 @@
+"""Add map_tiles table with precomputed tile payloads
+
+Revision ID: map_tiles
+Revises: data_versions
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'map_tiles'
+down_revision: Union[str, None] = 'data_versions'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'map_tiles',
+        sa.Column('z', sa.SmallInteger(), nullable=False),
+        sa.Column('x', sa.Integer(), nullable=False),
+        sa.Column('y', sa.Integer(), nullable=False),
+        sa.Column('payload', sa.LargeBinary(), nullable=False),
+        sa.Column('organizations', sa.Integer(), nullable=False),
+        sa.Column(
+            'updated_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False
+        ),
+        sa.PrimaryKeyConstraint('z', 'x', 'y')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('map_tiles')
@@ -0,0 +1,41 @@
+"""Add pg_trgm GIN index on organizations.name
+
+Revision ID: organizations_name_trgm
+Revises: buildings_lat_lon_index
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'organizations_name_trgm'
+down_revision: Union[str, None] = 'buildings_lat_lon_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # CONCURRENTLY не блокирует запись в таблицу, но не работает внутри
+    # транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_organizations_name_trgm', 'organizations', ['name'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_organizations_name_trgm', table_name='organizations',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
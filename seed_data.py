@@ -1,8 +1,18 @@
 """
 Скрипт для генерации тестовых данных
+
+Без аргументов создает небольшой демонстрационный набор. Синтетический
+набор для нагрузочных тестов:
+
+    python seed_data.py --orgs 5000000 --buildings 1000000 --seed 42
 """
+import argparse
 import asyncio
-from typing import List
+import math
+import random
+import time
+from typing import Iterable, Iterator, List, Tuple
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import AsyncSessionLocal
 from app.models import Activity, Building, Organization, OrganizationPhone
@@ -196,5 +206,330 @@ async def seed_database():
         print("Тестовые данные успешно созданы!")
 
 
+# ---------------------------------------------------------------------------
+# Генерация больших синтетических наборов для нагрузочных тестов
+# ---------------------------------------------------------------------------
+
+# Границы генерации координат (Москва)
+SYNTHETIC_BOUNDS = (55.55, 55.95, 37.30, 37.90)
+
+LEGAL_FORMS = ["ООО", "ИП", "ЗАО", "ОАО", "ПАО", "АО"]
+NAME_WORDS = [
+    "Торговый дом", "Компания", "Группа", "Холдинг", "Корпорация",
+    "Центр", "Студия", "Мастерская", "Сервис", "Альянс",
+]
+NAME_TOPICS = [
+    "Продукты", "Одежда", "Электроника", "Мебель", "Медицина",
+    "Образование", "Финансы", "Транспорт", "Связь", "Стройматериалы",
+    "Книги", "Спорттовары", "Косметика", "Игрушки", "Автозапчасти",
+]
+STREETS = [
+    "ул. Тверская", "ул. Арбат", "пр. Мира", "Ленинский проспект",
+    "ул. Петровка", "ул. Сретенка", "ул. Покровка", "ул. Мясницкая",
+    "Кутузовский проспект", "ул. Профсоюзная", "Варшавское шоссе",
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Без --orgs/--buildings создает небольшой демонстрационный "
+            "набор; с ними - синтетический набор заданного размера"
+        )
+    )
+    parser.add_argument("--orgs", type=int, help="Число организаций")
+    parser.add_argument("--buildings", type=int, help="Число зданий")
+    parser.add_argument(
+        "--seed", type=int, default=42,
+        help="Зерно генератора: одинаковое зерно - одинаковые данные"
+    )
+    parser.add_argument(
+        "--clusters", type=int, default=50,
+        help="Число центров плотной застройки"
+    )
+    parser.add_argument(
+        "--cluster-radius-m", type=float, default=1500,
+        help="Стандартное отклонение координат вокруг центра, метры"
+    )
+    parser.add_argument(
+        "--background-share", type=float, default=0.2,
+        help="Доля зданий, равномерно разбросанных вне кластеров"
+    )
+    parser.add_argument(
+        "--activity-depth", type=int, default=3, choices=[1, 2, 3],
+        help="Глубина дерева деятельностей (API допускает до 3 уровней)"
+    )
+    parser.add_argument(
+        "--activity-branching", type=int, default=10,
+        help="Число дочерних деятельностей у каждого узла"
+    )
+    parser.add_argument(
+        "--activities-per-org", type=int, default=3,
+        help="Максимум деятельностей у организации"
+    )
+    parser.add_argument(
+        "--zipf", type=float, default=1.1,
+        help="Показатель распределения Ципфа популярности деятельностей"
+    )
+    parser.add_argument(
+        "--phones-per-org", type=int, default=3,
+        help="Максимум телефонов у организации"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=50_000,
+        help="Строк в одной пачке COPY"
+    )
+    parser.add_argument(
+        "--truncate", action="store_true",
+        help="Очистить таблицы перед генерацией"
+    )
+    args = parser.parse_args()
+    for name in ("orgs", "buildings", "batch_size", "activity_branching"):
+        value = getattr(args, name)
+        if value is not None and value < 1:
+            parser.error(f"--{name.replace('_', '-')} должно быть больше 0")
+    return args
+
+
+def generate_activities(depth: int, branching: int) -> List[tuple]:
+    """Дерево деятельностей: (id, name, parent_id, level) в порядке id"""
+    activities = []
+    parents = [(None, "")]
+    for level in range(1, depth + 1):
+        children = []
+        for parent_id, prefix in parents:
+            for index in range(1, branching + 1):
+                activity_id = len(activities) + 1
+                path = f"{prefix}.{index}" if prefix else str(index)
+                activities.append(
+                    (activity_id, f"Деятельность {path}", parent_id, level)
+                )
+                children.append((activity_id, path))
+        parents = children
+    return activities
+
+
+def zipf_cum_weights(count: int, exponent: float) -> List[float]:
+    """Накопленные веса Ципфа для ранга 1..count"""
+    total = 0.0
+    cum_weights = []
+    for rank in range(1, count + 1):
+        total += 1 / rank ** exponent
+        cum_weights.append(total)
+    return cum_weights
+
+
+def generate_buildings(
+    rng: random.Random, args: argparse.Namespace
+) -> Iterator[tuple]:
+    """Здания (id, address, latitude, longitude) с кластерами плотности"""
+    min_lat, max_lat, min_lon, max_lon = SYNTHETIC_BOUNDS
+    centers = [
+        (rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon))
+        for _ in range(max(args.clusters, 1))
+    ]
+    # Крупные кластеры встречаются чаще мелких
+    center_weights = zipf_cum_weights(len(centers), 1.0)
+    sigma_lat = args.cluster_radius_m / 111_320
+    sigma_lon = sigma_lat / math.cos(math.radians((min_lat + max_lat) / 2))
+
+    for building_id in range(1, args.buildings + 1):
+        if rng.random() < args.background_share:
+            latitude = rng.uniform(min_lat, max_lat)
+            longitude = rng.uniform(min_lon, max_lon)
+        else:
+            center_lat, center_lon = rng.choices(
+                centers, cum_weights=center_weights
+            )[0]
+            latitude = min(
+                max(rng.gauss(center_lat, sigma_lat), min_lat), max_lat
+            )
+            longitude = min(
+                max(rng.gauss(center_lon, sigma_lon), min_lon), max_lon
+            )
+        address = f"{rng.choice(STREETS)}, {rng.randint(1, 200)}"
+        yield building_id, address, latitude, longitude
+
+
+def generate_organizations(
+    rng: random.Random,
+    args: argparse.Namespace,
+    activity_ids: List[int]
+) -> Iterator[Tuple[tuple, List[tuple], List[tuple]]]:
+    """Организация, ее телефоны и связи с деятельностями"""
+    # Популярность деятельностей по Ципфу со случайным порядком рангов
+    ranked = activity_ids[:]
+    rng.shuffle(ranked)
+    cum_weights = zipf_cum_weights(len(ranked), args.zipf)
+    phone_id = 0
+
+    for organization_id in range(1, args.orgs + 1):
+        name = (
+            f"{rng.choice(LEGAL_FORMS)} {rng.choice(NAME_WORDS)} "
+            f"{rng.choice(NAME_TOPICS)} {organization_id}"
+        )
+        organization = (
+            organization_id, name, rng.randint(1, args.buildings)
+        )
+
+        phones = []
+        for _ in range(rng.randint(1, args.phones_per_org)):
+            phone_id += 1
+            number = rng.randrange(10_000_000)
+            phones.append((
+                phone_id,
+                f"+7(495){number // 10_000:03d}-"
+                f"{number // 100 % 100:02d}-{number % 100:02d}",
+                organization_id
+            ))
+
+        chosen = set(rng.choices(
+            ranked,
+            cum_weights=cum_weights,
+            k=rng.randint(1, args.activities_per_org)
+        ))
+        links = [
+            (organization_id, activity_id) for activity_id in sorted(chosen)
+        ]
+        yield organization, phones, links
+
+
+async def copy_batches(
+    connection, table: str, columns: List[str], records: Iterable[tuple],
+    batch_size: int
+) -> int:
+    """COPY записей в таблицу пачками по batch_size строк"""
+    copied = 0
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            await connection.copy_records_to_table(
+                table, records=batch, columns=columns
+            )
+            copied += len(batch)
+            batch = []
+    if batch:
+        await connection.copy_records_to_table(
+            table, records=batch, columns=columns
+        )
+        copied += len(batch)
+    return copied
+
+
+async def seed_synthetic(args: argparse.Namespace):
+    """Синтетический набор заданного размера через COPY"""
+    if args.orgs is None:
+        args.orgs = args.buildings * 5
+    if args.buildings is None:
+        args.buildings = max(args.orgs // 5, 1)
+    rng = random.Random(args.seed)
+
+    async with AsyncSessionLocal() as session:
+        if args.truncate:
+            await session.execute(text(
+                "TRUNCATE organization_activities, organization_phones, "
+                "organizations, buildings, activities RESTART IDENTITY"
+            ))
+            await session.commit()
+        elif await session.scalar(text(
+            "SELECT EXISTS (SELECT 1 FROM organizations) "
+            "OR EXISTS (SELECT 1 FROM activities)"
+        )):
+            raise SystemExit(
+                "Таблицы не пусты: запустите с --truncate для перезаписи"
+            )
+
+        connection = await session.connection()
+        raw = (await connection.get_raw_connection()).driver_connection
+        # Потеря последних транзакций при сбое для генератора не страшна
+        await session.execute(text("SET LOCAL synchronous_commit = off"))
+
+        started = time.perf_counter()
+        activities = generate_activities(
+            args.activity_depth, args.activity_branching
+        )
+        await copy_batches(
+            raw, "activities", ["id", "name", "parent_id", "level"],
+            activities, args.batch_size
+        )
+        print(f"Создано {len(activities)} видов деятельности")
+
+        count = await copy_batches(
+            raw, "buildings", ["id", "address", "latitude", "longitude"],
+            generate_buildings(rng, args), args.batch_size
+        )
+        print(f"Создано {count} зданий")
+
+        # Организации, телефоны и связи генерируются одним проходом и
+        # копируются пачками, не накапливая весь набор в памяти
+        organizations, phones, links = [], [], []
+        totals = [0, 0, 0]
+        for organization, org_phones, org_links in generate_organizations(
+            rng, args, [activity[0] for activity in activities]
+        ):
+            organizations.append(organization)
+            phones.extend(org_phones)
+            links.extend(org_links)
+            if len(organizations) >= args.batch_size:
+                await flush_organizations(
+                    raw, organizations, phones, links, totals
+                )
+                organizations, phones, links = [], [], []
+        await flush_organizations(raw, organizations, phones, links, totals)
+        print(
+            f"Создано {totals[0]} организаций, {totals[1]} телефонов, "
+            f"{totals[2]} связей с деятельностями"
+        )
+
+        # Идентификаторы заданы явно - сдвигаем последовательности
+        for table in (
+            "activities", "buildings", "organizations", "organization_phones"
+        ):
+            await session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"(SELECT coalesce(max(id), 1) FROM {table}))"
+            ))
+        await session.commit()
+
+    # Статистика планировщика после массовой загрузки
+    async with AsyncSessionLocal() as session:
+        await session.execute(text("ANALYZE"))
+        await session.commit()
+
+    print(
+        f"Синтетические данные созданы за "
+        f"{time.perf_counter() - started:.0f} с. Тайлы карты: "
+        f"python build_tiles.py"
+    )
+
+
+async def flush_organizations(
+    raw, organizations: list, phones: list, links: list, totals: list
+) -> None:
+    """Скопировать накопленную пачку организаций с телефонами и связями"""
+    if not organizations:
+        return
+    await raw.copy_records_to_table(
+        "organizations", records=organizations,
+        columns=["id", "name", "building_id"]
+    )
+    await raw.copy_records_to_table(
+        "organization_phones", records=phones,
+        columns=["id", "phone_number", "organization_id"]
+    )
+    await raw.copy_records_to_table(
+        "organization_activities", records=links,
+        columns=["organization_id", "activity_id"]
+    )
+    totals[0] += len(organizations)
+    totals[1] += len(phones)
+    totals[2] += len(links)
+
+
 if __name__ == "__main__":
-    asyncio.run(seed_database())
+    args = parse_args()
+    if args.orgs is None and args.buildings is None:
+        asyncio.run(seed_database())
+    else:
+        asyncio.run(seed_synthetic(args))
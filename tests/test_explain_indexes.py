@@ -0,0 +1,52 @@
+"""
+Планы горячих запросов читают свои индексы (benchmarks.explain_indexes).
+
+Нужен PostgreSQL: тест пересоздает схему в базе BENCHMARK_DATABASE_URL
+и пропускается, если переменная не задана.
+
+Запуск: BENCHMARK_DATABASE_URL=... python -m pytest tests
+"""
+import asyncio
+import os
+import pytest
+from benchmarks import explain_indexes
+from benchmarks.common import create_engine
+
+pytestmark = pytest.mark.skipif(
+    "BENCHMARK_DATABASE_URL" not in os.environ,
+    reason="нужна база PostgreSQL в BENCHMARK_DATABASE_URL"
+)
+
+
+@pytest.fixture(scope="module")
+def plans():
+    """Индексы в планах горячих запросов по их описанию"""
+
+    async def collect():
+        engine = create_engine()
+        try:
+            await explain_indexes.seed(engine)
+            async with engine.connect() as conn:
+                return {
+                    description: explain_indexes.index_names(
+                        await explain_indexes.explain(conn, query)
+                    )
+                    for description, query, _ in explain_indexes.hot_queries()
+                }
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize(
+    "description, index",
+    [
+        (description, index)
+        for description, _, index in explain_indexes.hot_queries()
+    ]
+)
+def test_hot_query_uses_index(plans, description, index):
+    assert index in plans[description], (
+        f"{description}: нет {index} в плане ({plans[description]})"
+    )
@@ -0,0 +1,146 @@
+"""
+Предфильтр поиска по радиусу (app.services.geo) против полного перебора
+по формуле Haversine: ни одна точка внутри окружности не должна
+отсекаться ячейками сетки или ограничивающим прямоугольником.
+
+Запуск: python -m pytest tests
+"""
+import math
+import random
+import pytest
+from app.services import geo
+
+# Точки на окружности и внутри нее по направлениям
+BEARINGS = 72
+DISTANCE_FRACTIONS = (0.0, 0.25, 0.5, 0.9, 0.999, 1.0)
+RANDOM_POINTS = 20000
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Расстояние как в geo.distance_expr"""
+    lat_diff = math.radians(lat2 - lat1) / 2
+    lon_diff = math.radians(lon2 - lon1) / 2
+    return 2 * geo.EARTH_RADIUS_M * math.asin(math.sqrt(min(
+        math.sin(lat_diff) ** 2
+        + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2))
+        * math.sin(lon_diff) ** 2,
+        1.0
+    )))
+
+
+def destination(
+    latitude: float, longitude: float, bearing: float, distance_m: float
+):
+    """Точка на расстоянии distance_m по азимуту bearing (градусы)"""
+    angular = distance_m / geo.EARTH_RADIUS_M
+    lat1 = math.radians(latitude)
+    theta = math.radians(bearing)
+    lat2 = math.asin(min(max(
+        math.sin(lat1) * math.cos(angular)
+        + math.cos(lat1) * math.sin(angular) * math.cos(theta),
+        -1.0
+    ), 1.0))
+    lon2 = math.radians(longitude) + math.atan2(
+        math.sin(theta) * math.sin(angular) * math.cos(lat1),
+        math.cos(angular) - math.sin(lat1) * math.sin(lat2)
+    )
+    lon = (math.degrees(lon2) + 180) % 360 - 180
+    return math.degrees(lat2), lon
+
+
+def passes_prefilter(
+    bbox: geo.BoundingBox, latitude: float, longitude: float
+) -> bool:
+    """То же условие, что geo.radius_prefilter, вычисленное в Python"""
+    cell = geo.geo_cell(latitude, longitude)
+    in_cells = any(
+        start <= cell <= end for start, end in geo.geo_cell_ranges(bbox)
+    )
+    in_box = (
+        bbox.min_latitude <= latitude <= bbox.max_latitude
+        and any(
+            min_lon <= longitude <= max_lon
+            for min_lon, max_lon in bbox.longitude_ranges
+        )
+    )
+    return in_cells and in_box
+
+
+def candidate_points(latitude: float, longitude: float, radius_m: float):
+    """Точки по направлениям вокруг центра и случайные по всему шару"""
+    points = [
+        destination(latitude, longitude, bearing, radius_m * fraction)
+        for bearing in range(0, 360, 360 // BEARINGS)
+        for fraction in DISTANCE_FRACTIONS
+    ]
+    rng = random.Random(f"{latitude}:{longitude}:{radius_m}")
+    points.extend(
+        (
+            math.degrees(math.asin(rng.uniform(-1.0, 1.0))),
+            rng.uniform(-180.0, 180.0)
+        )
+        for _ in range(RANDOM_POINTS)
+    )
+    return points
+
+
+CASES = [
+    # Москва: обычный случай, один диапазон долгот
+    (55.7558, 37.6173, 1000),
+    # Антимеридиан с обеих сторон
+    (0.0, 179.999, 5000),
+    (-16.5, -179.98, 20000),
+    (65.0, 179.5, 150000),
+    # Полюса: окружность захватывает полюс
+    (89.99, 0.0, 5000),
+    (-89.95, 45.0, 20000),
+    # Высокие широты: размах долгот больше 180° (ratio >= 1)
+    (80.0, 10.0, 1500000),
+    # Больше 128 строк сетки: одна полоса широт
+    (10.0, 20.0, 500000),
+    # Огромные радиусы: четверть окружности и весь шар
+    (30.0, -120.0, 10000000),
+    (0.0, 0.0, geo.MAX_DISTANCE_M),
+]
+
+
+@pytest.mark.parametrize("latitude, longitude, radius_m", CASES)
+def test_prefilter_keeps_every_point_inside_radius(
+    latitude, longitude, radius_m
+):
+    bbox = geo.bounding_box(latitude, longitude, radius_m)
+    missed = [
+        (lat, lon)
+        for lat, lon in candidate_points(latitude, longitude, radius_m)
+        if haversine_m(latitude, longitude, lat, lon) <= radius_m
+        and not passes_prefilter(bbox, lat, lon)
+    ]
+    assert not missed, f"Отсечены точки внутри радиуса: {missed[:5]}"
+
+
+def test_antimeridian_splits_longitude_ranges():
+    bbox = geo.bounding_box(0.0, 179.999, 5000)
+    assert len(bbox.longitude_ranges) == 2
+    assert any(max_lon == 180.0 for _, max_lon in bbox.longitude_ranges)
+    assert any(min_lon == -180.0 for min_lon, _ in bbox.longitude_ranges)
+
+
+@pytest.mark.parametrize("latitude, longitude, radius_m", [
+    (89.99, 0.0, 5000),
+    (80.0, 10.0, 1500000),
+    (0.0, 0.0, geo.MAX_DISTANCE_M),
+])
+def test_pole_and_wide_circles_cover_all_longitudes(
+    latitude, longitude, radius_m
+):
+    bbox = geo.bounding_box(latitude, longitude, radius_m)
+    assert bbox.longitude_ranges == [(-180.0, 180.0)]
+
+
+def test_many_rows_collapse_to_one_latitude_band():
+    bbox = geo.bounding_box(10.0, 20.0, 500000)
+    ranges = geo.geo_cell_ranges(bbox)
+    assert len(ranges) == 1
+    start, end = ranges[0]
+    assert start % geo.GEO_CELL_COLUMNS == 0
+    assert end % geo.GEO_CELL_COLUMNS == geo.GEO_CELL_COLUMNS - 1